@@ -0,0 +1,353 @@
+from typing import Union, List, Iterable
+from pathlib import Path
+from itertools import chain
+import pandas as pd
+import numpy as np
+
+
+def get_pooled_quantiles(
+    parts: List[tuple],
+    probs: np.ndarray,
+    minimum: Union[np.ndarray, None]=None,
+    maximum: Union[np.ndarray, None]=None,
+) -> np.ndarray:
+    """Get quantiles of the distribution formed by pooling sets of weighted points,
+    placing each point at the middle of its share of the cumulative weight and interpolating
+    between them.
+
+    Args:
+        parts: Pairs of points (one row per point and one column per parameter) and the weight of
+            each point
+        probs: The probabilities to get the quantiles at
+        minimum: Exact minimum of each parameter, to anchor the quantile function at zero
+            probability
+        maximum: Exact maximum of each parameter, to anchor the quantile function at one
+
+    Returns:
+        Array with one row per probability and one column per parameter
+    """
+    points = np.concatenate([p for p, _ in parts])
+    weights = np.concatenate([np.broadcast_to(w, len(p)) for p, w in parts])
+    order = np.argsort(points, axis=0, kind='stable')
+    points = np.take_along_axis(points, order, axis=0)
+    weights = weights[order]
+    cum_weights = weights.cumsum(axis=0)
+    positions = (cum_weights - weights / 2.0) / cum_weights[-1]
+    if minimum is not None:
+        points = np.concatenate([minimum[np.newaxis, :], points, maximum[np.newaxis, :]])
+        positions = np.concatenate(
+            [np.zeros((1, points.shape[1])), positions, np.ones((1, points.shape[1]))]
+        )
+    values = np.empty((len(probs), points.shape[1]))
+    for i_param in range(points.shape[1]):
+        values[:, i_param] = np.interp(probs, positions[:, i_param], points[:, i_param])
+    return values
+
+
+class PosteriorSummariser:
+    def __init__(
+        self, 
+        n_params: int,
+        resolution: int=1000,
+        max_batches: int=64,
+    ):
+        """Accumulate summaries of posterior draws chunk by chunk, using memory that does not grow
+        with the number of draws.
+        Means and variances are combined exactly across chunks,
+        and effective sample sizes are estimated by batch means,
+        with adjacent batches merged whenever their number exceeds twice the maximum.
+        Quantiles are tracked with sketches of each parameter's quantile function at a fixed grid
+        of probabilities.
+        Draws are buffered until there are enough to fill a sketch,
+        and sketches of equal rank are merged in pairs (as in a binary counter),
+        so each draw passes through at most log2(draws / resolution) merges,
+        however the draws are chunked and however the chunks differ from one another
+        (as consecutive chunks of an autocorrelated chain do).
+
+        Args:
+            n_params: Number of parameters (columns of each chunk)
+            resolution: Number of points in the quantile sketches
+            max_batches: Number of batch means kept for effective sample size estimation
+        """
+        self.n_params = n_params
+        self.grid = (np.arange(resolution) + 0.5) / resolution
+        self.max_batches = max_batches
+        self.n_draws = 0
+        self.mean = np.zeros(n_params)
+        self.sum_sq = np.zeros(n_params)
+        self.minimum = np.full(n_params, np.inf)
+        self.maximum = np.full(n_params, -np.inf)
+        self.sketch_buffer = []
+        self.n_buffered = 0
+        self.sketches = []
+        self.batch_size = 1
+        self.batch_sums = np.empty((0, n_params))
+        self.partial_sum = np.zeros(n_params)
+        self.partial_n = 0
+
+    def update(
+        self, 
+        chunk: np.ndarray,
+    ):
+        """Add a chunk of consecutive draws to the summaries.
+
+        Args:
+            chunk: Draws with one row per draw and one column per parameter
+        """
+        chunk = np.asarray(chunk, dtype=float).reshape(len(chunk), -1)
+        if chunk.shape[1] != self.n_params:
+            raise ValueError(f'Chunk has {chunk.shape[1]} parameters, expected {self.n_params}')
+        n_chunk = len(chunk)
+        if not n_chunk:
+            return
+
+        # Means and sums of squared deviations, combined pairwise
+        chunk_mean = chunk.mean(axis=0)
+        chunk_sum_sq = ((chunk - chunk_mean) ** 2).sum(axis=0)
+        n_total = self.n_draws + n_chunk
+        delta = chunk_mean - self.mean
+        self.mean = self.mean + delta * n_chunk / n_total
+        self.sum_sq = self.sum_sq + chunk_sum_sq + delta ** 2 * self.n_draws * n_chunk / n_total
+        self.minimum = np.minimum(self.minimum, chunk.min(axis=0))
+        self.maximum = np.maximum(self.maximum, chunk.max(axis=0))
+
+        self.update_sketch(chunk)
+        self.n_draws = n_total
+        self.update_batches(chunk)
+
+    def update_sketch(
+        self, 
+        chunk: np.ndarray,
+    ):
+        """Add a chunk to the buffered draws,
+        and sketch the buffer once it holds at least as many draws as the sketch has points.
+
+        Args:
+            chunk: Draws as for update
+        """
+        if self.n_buffered + len(chunk) < len(self.grid):
+            # Copied, as the chunk may be a view the caller reuses
+            self.sketch_buffer.append(np.array(chunk))
+            self.n_buffered += len(chunk)
+            return
+        draws = np.concatenate(self.sketch_buffer + [chunk]) if self.sketch_buffer else chunk
+        self.sketch_buffer = []
+        self.n_buffered = 0
+        self.add_sketch(get_pooled_quantiles([(draws, 1.0)], self.grid), len(draws))
+
+    def add_sketch(
+        self, 
+        sketch: np.ndarray,
+        n_sketch: int,
+        rank: int=0,
+    ):
+        """Add a sketch to the list held, merging it with the one held at its rank if there is one,
+        and carrying the merged sketch up to the next rank.
+
+        Args:
+            sketch: Quantiles at the grid probabilities, with one row per probability and one
+                column per parameter
+            n_sketch: Number of draws the sketch summarises
+            rank: The number of merges the sketch has been through
+        """
+        while True:
+            if rank == len(self.sketches):
+                self.sketches.append(None)
+            if self.sketches[rank] is None:
+                self.sketches[rank] = (sketch, n_sketch)
+                return
+            held, n_held = self.sketches[rank]
+            self.sketches[rank] = None
+            parts = [(held, n_held / len(self.grid)), (sketch, n_sketch / len(self.grid))]
+            sketch = get_pooled_quantiles(parts, self.grid)
+            n_sketch += n_held
+            rank += 1
+
+    def update_batches(
+        self, 
+        chunk: np.ndarray,
+    ):
+        """Add a chunk's draws to the batch sums used for effective sample size estimation.
+
+        Args:
+            chunk: Draws as for update
+        """
+        start = min(self.batch_size - self.partial_n, len(chunk))
+        self.partial_sum += chunk[:start].sum(axis=0)
+        self.partial_n += start
+        if self.partial_n < self.batch_size:
+            return
+        n_full = (len(chunk) - start) // self.batch_size
+        stop = start + n_full * self.batch_size
+        full_sums = chunk[start: stop].reshape(n_full, self.batch_size, self.n_params).sum(axis=1)
+        self.batch_sums = np.concatenate(
+            [self.batch_sums, self.partial_sum[np.newaxis, :], full_sums]
+        )
+        self.partial_sum = chunk[stop:].sum(axis=0)
+        self.partial_n = len(chunk) - stop
+        while len(self.batch_sums) > 2 * self.max_batches:
+            self.merge_batches()
+
+    def merge_batches(self):
+        """Halve the number of batches by adding adjacent pairs,
+        with any unpaired last batch returned to the partial batch.
+        """
+        n_pairs = len(self.batch_sums) // 2
+        if len(self.batch_sums) % 2:
+            self.partial_sum += self.batch_sums[-1]
+            self.partial_n += self.batch_size
+        self.batch_sums = self.batch_sums[:2 * n_pairs].reshape(n_pairs, 2, -1).sum(axis=1)
+        self.batch_size *= 2
+
+    def get_ess(self) -> np.ndarray:
+        """Estimate the effective sample sizes from the variance of the batch means.
+
+        Returns:
+            Effective sample size for each parameter
+        """
+        if len(self.batch_sums) < 2 or self.n_draws < 2:
+            return np.full(self.n_params, np.nan)
+        batch_var = (self.batch_sums / self.batch_size).var(axis=0, ddof=1)
+        draw_var = self.sum_sq / (self.n_draws - 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ess = self.n_draws * draw_var / (self.batch_size * batch_var)
+        return np.minimum(ess, self.n_draws)
+
+    def get_quantiles(
+        self, 
+        quantiles: Iterable[float],
+    ) -> np.ndarray:
+        """Get quantiles by pooling the sketches held with the buffered draws,
+        anchored at the exact minimum and maximum.
+
+        Args:
+            quantiles: The quantiles to get
+
+        Returns:
+            Array with one row per quantile and one column per parameter
+        """
+        quantiles = np.asarray(quantiles, dtype=float)
+        if not self.n_draws:
+            return np.full((len(quantiles), self.n_params), np.nan)
+        parts = [(s, n / len(self.grid)) for s, n in filter(None, self.sketches)]
+        parts += [(b, 1.0) for b in self.sketch_buffer]
+        return get_pooled_quantiles(parts, quantiles, self.minimum, self.maximum)
+
+    def get_summary(
+        self, 
+        quantiles: Iterable[float]=(0.025, 0.5, 0.975),
+        param_names: Union[List[str], None]=None,
+    ) -> pd.DataFrame:
+        """Get the summary table of the draws added so far.
+
+        Args:
+            quantiles: The quantiles to report
+            param_names: Names for the parameters (defaults to their positions)
+
+        Returns:
+            Table with one row per parameter, with columns for the mean, standard deviation,
+            each quantile (labelled by its value as for get_interval_table) and the effective
+            sample size
+        """
+        quantiles = list(quantiles)
+        sd = (
+            np.sqrt(self.sum_sq / (self.n_draws - 1))
+            if self.n_draws > 1
+            else np.full(self.n_params, np.nan)
+        )
+        summary = pd.DataFrame(
+            self.get_quantiles(quantiles).T, columns=quantiles, index=param_names
+        )
+        summary.insert(0, 'mean', self.mean if self.n_draws else np.nan)
+        summary.insert(1, 'sd', sd)
+        summary['ess'] = self.get_ess()
+        return summary
+
+
+def get_draw_chunks(
+    draws,
+    chunk_size: int=100000,
+) -> tuple:
+    """Get the parameter names and an iterator over chunks of rows
+    from posterior draws supplied in any of the forms accepted by get_posterior_summary.
+
+    Args:
+        draws: The draws, or the path to a .npy or .parquet file of them
+        chunk_size: Number of draws per chunk, for sources read in chunks here
+
+    Returns:
+        The parameter names (or None if not available) and the iterator over two-dimensional chunks
+    """
+    if isinstance(draws, (str, Path)):
+        draws_path = Path(draws)
+        if draws_path.suffix == '.npy':
+            draws = np.load(draws_path, mmap_mode='r')
+        elif draws_path.suffix == '.parquet':
+            import pyarrow.parquet as pq
+            parquet_file = pq.ParquetFile(draws_path)
+            batches = parquet_file.iter_batches(batch_size=chunk_size)
+            chunks = (
+                np.column_stack([col.to_numpy(zero_copy_only=False) for col in batch.columns])
+                for batch in batches
+            )
+            return list(parquet_file.schema_arrow.names), chunks
+        else:
+            raise ValueError(f'Draws file type not supported: {draws_path.suffix}')
+    if isinstance(draws, pd.DataFrame):
+        chunks = (
+            draws.iloc[i: i + chunk_size].to_numpy(dtype=float)
+            for i in range(0, len(draws), chunk_size)
+        )
+        return list(draws.columns), chunks
+    if isinstance(draws, np.ndarray):
+        draws = draws.reshape(len(draws), -1)
+        return None, (draws[i: i + chunk_size] for i in range(0, len(draws), chunk_size))
+
+    # Any other iterable is taken as a sequence of chunks,
+    # with names from the first if it is a dataframe
+    chunks = iter(draws)
+    first_chunk = next(chunks, None)
+    if first_chunk is None:
+        raise ValueError('No draws supplied')
+    names = list(first_chunk.columns) if isinstance(first_chunk, pd.DataFrame) else None
+    return names, (np.asarray(chunk, dtype=float) for chunk in chain([first_chunk], chunks))
+
+
+def get_posterior_summary(
+    draws: Union[np.ndarray, pd.DataFrame, Iterable[np.ndarray], Iterable[pd.DataFrame], str, Path],
+    quantiles: Iterable[float]=(0.025, 0.5, 0.975),
+    param_names: Union[List[str], None]=None,
+    chunk_size: int=100000,
+    resolution: int=1000,
+) -> pd.DataFrame:
+    """Summarise posterior draws in a single streaming pass, without materialising them all in
+    memory.
+    Arrays (including memory-mapped arrays) and dataframes are read in chunks of rows,
+    .npy files are memory-mapped and .parquet files are read in record batches.
+    Quantiles are approximate, being interpolated from sketches that have each been through
+    at most log2(draws / resolution) merges (see PosteriorSummariser).
+    The error is within 1 / resolution in probability in the tests,
+    which include a strongly autocorrelated chain (AR(1) with coefficient 0.99) read in small
+    chunks.
+
+    Args:
+        draws: The draws (one row per draw and one column per parameter), an iterable of chunks of
+            them, or a file path
+        quantiles: The quantiles to report
+        param_names: Names for the parameters, if not taken from the draws' columns
+        chunk_size: Number of draws per chunk for arrays, dataframes and files
+        resolution: Number of points in the quantile sketches
+
+    Returns:
+        Summary table as from PosteriorSummariser.get_summary
+    """
+    names, chunks = get_draw_chunks(draws, chunk_size)
+    summariser = None
+    for chunk in chunks:
+        chunk = chunk.reshape(len(chunk), -1)
+        if summariser is None:
+            summariser = PosteriorSummariser(chunk.shape[1], resolution=resolution)
+        summariser.update(chunk)
+    if summariser is None:
+        raise ValueError('No draws supplied')
+    return summariser.get_summary(quantiles, param_names or names)
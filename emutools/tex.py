@@ -1,5 +1,16 @@
-from typing import Union, List
+from typing import Union, List, Iterable, Iterator
 from pathlib import Path
+from itertools import chain
+from functools import wraps, lru_cache
+from collections import OrderedDict
+from contextlib import contextmanager
+from collections.abc import MutableSequence
+import os
+import re
+import sqlite3
+import shutil
+import hashlib
+import tempfile
 import pandas as pd
 import numpy as np
 import yaml as yml
@@ -9,6 +20,37 @@ from matplotlib.figure import Figure as MplFig
 from matplotlib import pyplot as plt
 from plotly.graph_objects import Figure as PlotlyFig
 
+from emutools.posterior import get_posterior_summary
+
+TEX_NAMED_CHARS = {
+    '~': '\\textasciitilde{}',
+    '^': '\\textasciicircum{}',
+    '\x00': '\\textbackslash{}',
+}
+
+MAX_TABLE_BLOCK_CELLS = 10000  # Cells per block when splitting tables to stay within TeX memory
+AUTO_WIDTH_SAMPLE_ROWS = 10000  # Rows measured when setting column widths automatically
+
+# pandas options that affect the rendered tables, natively or through Styler
+STYLER_RENDER_OPTIONS = [
+    'styler.format.precision',
+    'styler.format.decimal',
+    'styler.format.thousands',
+    'styler.format.na_rep',
+    'styler.format.escape',
+    'styler.format.formatter',
+    'styler.sparse.index',
+    'styler.sparse.columns',
+    'styler.latex.multicol_align',
+    'styler.latex.multirow_align',
+    'styler.latex.environment',
+]
+
+FIGURE_COMMANDS = {
+    'jpg': 'includegraphics',
+    'svg': 'includesvg',
+}
+
 
 def get_tex_formatted_date(
     date: datetime,
@@ -35,70 +77,2669 @@ def get_tex_formatted_date(
     return f'{date_of_month}\\textsuperscript{{{text_super}}}{date.strftime(" of %B %Y")}'
 
 
-def remove_underscore_multiindexcol(
-    df: pd.DataFrame,
-) -> pd.DataFrame:
-    """Remove underscores from multi-index columns
-    (because TeX so often crashes with underscores in floats, such as tables).
+@lru_cache(maxsize=None)
+def get_month_names() -> np.ndarray:
+    """Get the full names of the months (as for strftime's %B), worked out once.
+
+    Returns:
+        Array of the names in calendar order
+    """
+    return np.array(
+        [datetime(2000, month, 1).strftime('%B') for month in range(1, 13)], dtype=object
+    )
+
+
+def get_tex_formatted_dates(
+    dates: Union[pd.DatetimeIndex, pd.Series, np.ndarray],
+    na_rep: str='',
+) -> np.ndarray:
+    """Get TeX-formatted dates as for get_tex_formatted_date for a whole set of dates at once,
+    selecting the ordinal suffixes from the array of the days of the month.
+
+    Args:
+        dates: The dates, as a datetime index, series or NumPy datetime64 array
+        na_rep: Text for missing dates
+
+    Returns:
+        Array of the formatted strings
+    """
+    dates = pd.DatetimeIndex(dates)
+    missing = dates.isna()
+    day = dates.day.to_numpy(dtype=float, na_value=1).astype(int)
+    month = dates.month.to_numpy(dtype=float, na_value=1).astype(int)
+    year = dates.year.to_numpy(dtype=float, na_value=1).astype(int)
+    last_digit = day % 10
+    special = (last_digit >= 1) & (last_digit <= 3) & ((day < 11) | (day > 13))
+    suffixes = np.array(['th', 'st', 'nd', 'rd'], dtype=object)[np.where(special, last_digit, 0)]
+    formatted = (
+        day.astype(str).astype(object)
+        + '\\textsuperscript{'
+        + suffixes
+        + '} of '
+        + get_month_names()[month - 1]
+        + ' '
+        + year.astype(str).astype(object)
+    )
+    formatted[missing] = na_rep
+    return formatted
+
+
+def replace_label_text(
+    labels: pd.Index,
+    old: str,
+    new: str,
+) -> pd.Index:
+    """Replace text in the string entries of a set of labels, leaving other entries as they are.
+
+    Args:
+        labels: The labels (e.g. the values of one level of a multi-index)
+        old: Text to replace
+        new: Replacement text
+
+    Returns:
+        The revised labels
+    """
+    if pd.api.types.infer_dtype(labels, skipna=True) == 'string':
+        return labels.str.replace(old, new, regex=False)
+    return labels.map(lambda v: v.replace(old, new) if isinstance(v, str) else v)
+
+
+def replace_index_text(
+    index: pd.Index,
+    old: str,
+    new: str,
+) -> pd.Index:
+    """Replace text in the labels and names of an index.
+    For a multi-index this works on the unique values of each level,
+    which are all set at once, with the level codes only remapped 
+    for levels where the replacement merges labels (e.g. 'a_b' and 'a b').
+
+    Args:
+        index: The row or column index
+        old: Text to replace
+        new: Replacement text
+
+    Returns:
+        The revised index
+    """
+    names = [n.replace(old, new) if isinstance(n, str) else n for n in index.names]
+    if isinstance(index, pd.MultiIndex):
+        levels, codes = [], []
+        for level, level_codes in zip(index.levels, index.codes):
+            level = replace_label_text(level, old, new)
+            if not level.is_unique:
+                merged_codes, level = pd.factorize(level)
+                level_codes = np.where(level_codes == -1, -1, merged_codes[level_codes])
+            levels.append(level)
+            codes.append(level_codes)
+        return pd.MultiIndex(levels=levels, codes=codes, names=names, verify_integrity=False)
+    return replace_label_text(index, old, new).set_names(names)
+
+
+def clean_tex_headers(
+    df: pd.DataFrame,
+    old: str='_',
+    new: str=' ',
+    index: bool=True,
+    columns: bool=True,
+    inplace: bool=False,
+) -> pd.DataFrame:
+    """Replace text (by default underscores, because TeX so often crashes with underscores in
+    floats, such as tables)
+    in the row and column labels of a dataframe and their names.
+    Only the labels are rebuilt, so the data of the dataframe is never copied:
+    either the dataframe's own labels are replaced, or a shallow copy sharing its data is returned
+    with the new labels.
+
+    Args:
+        df: Dataframe to clean
+        old: Text to replace
+        new: Replacement text
+        index: Whether to clean the row index
+        columns: Whether to clean the column index
+        inplace: Whether to modify the dataframe passed rather than a shallow copy
+
+    Returns:
+        The dataframe with the cleaned labels (the one passed if in place)
+    """
+    cleaned = df if inplace else df.copy(deep=False)
+    if index:
+        cleaned.index = replace_index_text(df.index, old, new)
+    if columns:
+        cleaned.columns = replace_index_text(df.columns, old, new)
+    return cleaned
+
+
+def remove_underscore_multiindexcol(
+    df: pd.DataFrame,
+) -> pd.DataFrame:
+    """Remove underscores from multi-index columns, modifying the dataframe passed
+    (retained for existing code, with clean_tex_headers preferred).
+
+    Args:
+        df: Dataframe to modify
+
+    Returns:
+        Revised dataframe
+    """
+    return clean_tex_headers(df, index=False, inplace=True)
+
+
+def get_fixed_strings(
+    values: np.ndarray,
+    decimal_places: int,
+) -> np.ndarray:
+    """Format an array of numbers to strings with a fixed number of decimal places
+    using integer arithmetic on the whole array rather than formatting each number.
+    Values within floating point error of a rounding tie may differ in the last digit 
+    from Python's string formatting.
+
+    Args:
+        values: The numbers to format
+        decimal_places: Number of decimal places
+
+    Returns:
+        Array of the formatted strings
+    """
+    values = np.asarray(values, dtype=float)
+    scaled = np.round(values * 10.0 ** decimal_places)
+    formatted = np.empty(values.shape, dtype=object)
+    exact = np.isfinite(scaled) & (np.abs(scaled) < 2.0 ** 53)
+    formatted[~exact] = np.char.mod(f'%.{decimal_places}f', values[~exact])
+    whole, frac = np.divmod(np.abs(scaled[exact]).astype(np.int64), 10 ** decimal_places)
+    text = whole.astype(str)
+    if decimal_places > 0:
+        text = np.char.add(np.char.add(text, '.'), np.char.zfill(frac.astype(str), decimal_places))
+    formatted[exact] = np.where(np.signbit(scaled[exact]), np.char.add('-', text), text)
+    return formatted
+
+
+def get_rounded_strings(
+    values: np.ndarray,
+    decimal_places: int=2,
+    sig_figs: Union[int, None]=None,
+) -> np.ndarray:
+    """Format an array of numbers to strings with a fixed number of decimal places
+    or to a number of significant figures, working on the whole array at once.
+    For significant figures, the values are rounded together and then formatted in groups
+    sharing the same number of decimal places.
+
+    Args:
+        values: The numbers to format
+        decimal_places: Number of decimal places if significant figures not requested
+        sig_figs: Number of significant figures
+
+    Returns:
+        Array of the formatted strings
+    """
+    values = np.asarray(values, dtype=float)
+    if sig_figs is None:
+        return get_fixed_strings(values, decimal_places)
+
+    def get_decimals(x):
+        nonzero = np.isfinite(x) & (x != 0.0)
+        magnitudes = np.zeros(x.shape, dtype=int)
+        magnitudes[nonzero] = np.floor(np.log10(np.abs(x[nonzero]))).astype(int)
+        return sig_figs - 1 - magnitudes
+
+    scales = 10.0 ** get_decimals(values)
+    rounded = np.round(values * scales) / scales
+    # Recalculated in case rounding moved up a power of ten
+    places = np.clip(get_decimals(rounded), 0, None)
+    formatted = np.empty(values.shape, dtype=object)
+    for n_places in np.unique(places):
+        group = places == n_places
+        formatted[group] = get_fixed_strings(rounded[group], n_places)
+    return formatted
+
+
+def get_interval_table(
+    quantiles: pd.DataFrame,
+    central: float=0.5,
+    lower: float=0.025,
+    upper: float=0.975,
+    decimal_places: Union[int, dict]=2,
+    sig_figs: Union[int, dict, None]=None,
+    na_rep: str='',
+) -> pd.DataFrame:
+    """Format quantile summaries as 'central (lower--upper)' strings ready for a TeX table,
+    working on whole columns at once.
+    The last level of the input columns gives the quantile,
+    and each combination of the other column levels becomes a column of the output
+    (or the output has a single unnamed column if the input columns have only one level).
+
+    Args:
+        quantiles: Table of quantile values
+        central: The quantile for the central estimate (as labelled in the columns)
+        lower: The quantile for the lower bound
+        upper: The quantile for the upper bound
+        decimal_places: Decimal places for all output columns, or dictionary of them by output
+            column
+        sig_figs: Significant figures for all output columns, or dictionary of them by output
+            column,
+            which take precedence over decimal places where given
+        na_rep: Text for cells with any of their quantiles missing
+
+    Returns:
+        Table of the formatted intervals
+    """
+    multi = quantiles.columns.nlevels > 1
+    outputs = quantiles.columns.droplevel(-1).unique() if multi else pd.Index([''])
+    intervals = {}
+    for output in outputs:
+        output_quantiles = quantiles[output] if multi else quantiles
+        if isinstance(output_quantiles, pd.Series) or any(
+            q not in output_quantiles.columns for q in [central, lower, upper]
+        ):
+            raise ValueError(f'Requested quantiles not all available for {output}')
+        places = (
+            decimal_places.get(output, 2) if isinstance(decimal_places, dict) else decimal_places
+        )
+        figs = sig_figs.get(output) if isinstance(sig_figs, dict) else sig_figs
+        values = output_quantiles[[central, lower, upper]].to_numpy(dtype=float, na_value=np.nan)
+        strings = get_rounded_strings(values, places, figs)
+        text = strings[:, 0] + ' (' + strings[:, 1] + '--' + strings[:, 2] + ')'
+        text[np.isnan(values).any(axis=1)] = na_rep
+        intervals[output] = text
+    interval_table = pd.DataFrame(intervals, index=quantiles.index)
+    interval_table.columns = outputs
+    return interval_table
+
+
+def get_tex_cell_strings(
+    values: Union[pd.Series, pd.Index],
+) -> np.ndarray:
+    """Format the values of a column or index to the strings that pandas Styler displays by default,
+    working on the whole column at once for the standard numeric and boolean types.
+
+    Args:
+        values: The column or index
+
+    Returns:
+        Array of the formatted strings
+    """
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind in 'fiub':
+        return get_array_cell_strings(values.to_numpy())
+    elif pd.api.types.infer_dtype(values, skipna=False) == 'string' and not values.isna().any():
+        return values.to_numpy(dtype=object)
+    return get_object_cell_strings(values.tolist())
+
+
+def get_array_cell_strings(
+    values: np.ndarray,
+) -> np.ndarray:
+    """Format a NumPy array of column values to strings as for get_tex_cell_strings.
+
+    Args:
+        values: The column values
+
+    Returns:
+        Array of the formatted strings
+    """
+    kind = values.dtype.kind
+    if kind == 'f':
+        return np.char.mod(f'%.{pd.get_option("styler.format.precision")}f', values)
+    elif kind in 'iu':
+        return values.astype(str)
+    elif kind == 'b':
+        return np.where(values, 'True', 'False')
+    elif kind in 'Mm':
+        return get_tex_cell_strings(pd.Series(values, copy=False))
+    return get_object_cell_strings(values.tolist())
+
+
+def get_object_cell_strings(
+    values: list,
+) -> np.ndarray:
+    """Format individual values to strings as pandas Styler does by default.
+
+    Args:
+        values: The values
+
+    Returns:
+        Array of the formatted strings
+    """
+    precision = pd.get_option('styler.format.precision')
+    formatted = []
+    for value in values:
+        if pd.api.types.is_float(value) or pd.api.types.is_complex(value):
+            formatted.append(f'{value:.{precision}f}')
+        else:
+            formatted.append(str(value))
+    return np.array(formatted, dtype=object)
+
+
+class ColumnarTable:
+    __slots__ = ('source', 'columns', 'index', 'shape', '_get_column')
+
+    def __init__(
+        self, 
+        source, 
+        names: List[str], 
+        n_rows: int, 
+        get_column: callable,
+    ):
+        """Light wrapper giving the table renderer access to the columns of a table 
+        that isn't a pandas dataframe, reading one column at a time as NumPy arrays.
+        Rows are labelled by position, as they would be if converted to pandas.
+
+        Args:
+            source: The original table
+            names: The column names
+            n_rows: The number of rows
+            get_column: Function to get the values of a column from its position
+        """
+        self.source = source
+        self.columns = pd.Index(names)
+        self.index = pd.RangeIndex(n_rows)
+        self.shape = (n_rows, len(names))
+        self._get_column = get_column
+
+    def get_column(
+        self, 
+        position: int,
+    ) -> np.ndarray:
+        """Get the values of a column.
+
+        Args:
+            position: The column's position
+
+        Returns:
+            The column values
+        """
+        return self._get_column(position)
+
+    def get_hash(self):
+        """Get a hash of the table's column names, types and contents, 
+        reading the columns as for rendering (as Polars dataframes can be modified in place).
+        """
+        if isinstance(self.source, np.ndarray) and not self.source.dtype.hasobject:
+            return hashlib.sha256(np.ascontiguousarray(self.source).view(np.uint8)).hexdigest()
+        table_hash = hashlib.sha256(repr(list(self.columns)).encode())
+        for i in range(self.shape[1]):
+            values = self.get_column(i)
+            table_hash.update(str(values.dtype).encode())
+            table_hash.update(
+                pd.util.hash_array(values).tobytes()
+                if values.dtype == object
+                else np.ascontiguousarray(values).view(np.uint8)
+            )
+        return table_hash.hexdigest()
+
+    def get_rows(
+        self, 
+        start: int, 
+        stop: int,
+    ) -> 'ColumnarTable':
+        """Get a block of rows, as a view on the columns of this table.
+
+        Args:
+            start: Position of the first row
+            stop: Position after the last row
+
+        Returns:
+            The block of the table
+        """
+        block = ColumnarTable(
+            self.source, list(self.columns), 0, lambda i: self.get_column(i)[start:stop]
+        )
+        block.index = pd.RangeIndex(start, stop)
+        block.shape = (len(block.index), self.shape[1])
+        return block
+
+    def to_pandas(self) -> pd.DataFrame:
+        """Convert to a pandas dataframe, for processing that needs one.
+
+        Returns:
+            The dataframe
+        """
+        columnar = pd.DataFrame(
+            {i: self.get_column(i) for i in range(self.shape[1])}, index=self.index
+        )
+        columnar.columns = self.columns
+        return columnar
+
+
+def fill_missing_text(
+    values: np.ndarray,
+) -> np.ndarray:
+    """Swap the None entries of a text column read from Arrow or Polars for the missing value
+    that converting the table to pandas gives (NaN where pandas infers its string type, otherwise
+    None).
+
+    Args:
+        values: The column values, as an object array of strings and None
+
+    Returns:
+        The column values with missing entries as pandas would have them
+    """
+    try:
+        infer_string = int(pd.__version__.split('.')[0]) >= 3 or pd.get_option(
+            'future.infer_string'
+        )
+    except (KeyError, pd.errors.OptionError):
+        infer_string = False
+    if not infer_string:
+        return values
+    missing = pd.isna(values)
+    if not missing.any():
+        return values
+    values = values.copy()
+    values[missing] = np.nan
+    return values
+
+
+def get_arrow_column(
+    table, 
+    position: int,
+) -> np.ndarray:
+    """Read a column of a PyArrow table as a NumPy array of the values that converting the table to
+    pandas gives.
+    Dates are read as datetime.date objects, and dictionary-encoded and time-zone-aware columns 
+    (which pandas holds as categoricals and time-zone-aware timestamps) go through their own pandas
+    conversion.
+
+    Args:
+        table: The table
+        position: The column's position
+
+    Returns:
+        The column values
+    """
+    column = table.column(position)
+    type_str = str(column.type)
+    if type_str.startswith('dictionary') or (
+        type_str.startswith('timestamp') and 'tz=' in type_str
+    ):
+        return column.to_pandas().to_numpy()
+    values = column.to_numpy(zero_copy_only=False)
+    if type_str.startswith('date'):
+        return values.astype('datetime64[D]').astype(object)
+    elif type_str in ['string', 'large_string', 'string_view']:
+        return fill_missing_text(values)
+    return values
+
+
+def get_polars_column(
+    table, 
+    position: int,
+) -> np.ndarray:
+    """Read a column of a Polars dataframe as a NumPy array of the values that converting the table
+    to pandas gives.
+    Categorical, enum, struct, array and time-zone-aware columns (which have no direct NumPy
+    equivalent)
+    go through their own pandas conversion.
+
+    Args:
+        table: The dataframe
+        position: The column's position
+
+    Returns:
+        The column values
+    """
+    column = table.to_series(position)
+    dtype_str = str(column.dtype)
+    if (
+        dtype_str.startswith(('Categorical', 'Enum', 'Struct', 'Array'))
+        or 'time_zone=' in dtype_str
+        and 'time_zone=None' not in dtype_str
+    ):
+        return column.to_pandas().to_numpy()
+    values = column.to_numpy()
+    if dtype_str in ['String', 'Utf8']:
+        return fill_missing_text(values)
+    return values
+
+
+def get_columnar_table(table) -> Union[ColumnarTable, None]:
+    """Wrap a PyArrow table, Polars dataframe or NumPy structured array for rendering,
+    without importing the libraries or copying the data into pandas.
+
+    Args:
+        table: The table
+
+    Returns:
+        The wrapped table, or None if the table isn't one of these types
+    """
+    module = type(table).__module__
+    if isinstance(table, np.ndarray) and table.dtype.names:
+        names = list(table.dtype.names)
+        return ColumnarTable(table, names, len(table), lambda i: table[names[i]])
+    elif module.startswith('pyarrow') and hasattr(table, 'column_names'):
+        return ColumnarTable(
+            table, table.column_names, table.num_rows, lambda i: get_arrow_column(table, i)
+        )
+    elif module.startswith('polars') and hasattr(table, 'get_column'):
+        return ColumnarTable(
+            table, table.columns, table.height, lambda i: get_polars_column(table, i)
+        )
+    return None
+
+
+def get_tex_tabular(
+    table: pd.DataFrame, 
+    col_format_str: str,
+) -> str:
+    """Get TeX tabular code with booktabs rules from dataframe, 
+    matching the output of pandas Styler's to_latex with hrules, 
+    but formatting each column as a whole and joining the rows in bulk.
+    Tables are passed through to Styler if its formatting or multi-index span alignment options
+    are set to values not reproduced here.
+
+    Args:
+        table: The pandas table, or wrapped table of another type
+        col_format_str: The previously created TeX column format request
+
+    Returns:
+        TeX string for the tabular environment
+    """
+    if not is_native_tex_supported():
+        table = table.to_pandas() if isinstance(table, ColumnarTable) else table
+        return table.style.to_latex(column_format=col_format_str, hrules=True)
+    return join_tex_tabular(
+        col_format_str, get_tex_tabular_header(table), get_tex_tabular_rows(table)
+    )
+
+
+def join_tex_tabular(
+    col_format_str: str,
+    header_str: str,
+    rows_str: str,
+) -> str:
+    """Put the header and body rows of a table together into a tabular environment with booktabs
+    rules.
+
+    Args:
+        col_format_str: The previously created TeX column format request
+        header_str: The header rows
+        rows_str: The body rows
+
+    Returns:
+        TeX string for the tabular environment
+    """
+    return ''.join([
+        f'\\begin{{tabular}}{{{col_format_str}}}\n',
+        '\\toprule\n',
+        header_str,
+        '\\midrule\n',
+        rows_str,
+        '\\bottomrule\n',
+        '\\end{tabular}\n',
+    ])
+
+
+def get_tex_render_options() -> tuple:
+    """Get the current values of the pandas options that affect the rendered tables,
+    for keying stored renderings.
+
+    Returns:
+        The option values (as strings, so they can be hashed)
+    """
+    return tuple(str(pd.get_option(option)) for option in STYLER_RENDER_OPTIONS)
+
+
+def is_native_tex_supported() -> bool:
+    """Whether the pandas Styler options are ones the native renderer reproduces,
+    which are the default cell formatting (other than precision) and the simple multi-index span
+    alignments.
+
+    Returns:
+        Whether tables can be rendered natively
+    """
+    return all([
+        pd.get_option('styler.format.decimal') == '.',
+        pd.get_option('styler.format.thousands') is None,
+        pd.get_option('styler.format.na_rep') is None,
+        pd.get_option('styler.format.escape') is None,
+        pd.get_option('styler.format.formatter') is None,
+        pd.get_option('styler.latex.multicol_align') in ['l', 'c', 'r'],
+        pd.get_option('styler.latex.multirow_align') in ['t', 'c', 'b'],
+    ])
+
+
+def split_styler_tabular(
+    table: pd.DataFrame,
+) -> tuple:
+    """Get the header and body rows of the tabular that pandas Styler produces for a table,
+    for use where the native renderer can't reproduce the Styler options set.
+
+    Args:
+        table: The pandas table
+
+    Returns:
+        The header rows and the body rows
+    """
+    tabular = table.style.to_latex(hrules=True)
+    header_start = tabular.index('\\toprule\n') + len('\\toprule\n')
+    header_end = tabular.index('\\midrule\n', header_start)
+    rows_end = tabular.rindex('\\bottomrule\n')
+    return tabular[header_start: header_end], tabular[header_end + len('\\midrule\n'): rows_end]
+
+
+def get_index_span_starts(
+    index: pd.Index,
+    level: int,
+) -> np.ndarray:
+    """Find where runs of repeated labels start for a level of a multi-index,
+    with a run broken wherever this level or any level above it changes,
+    as for sparsified display of a multi-index.
+    Worked out from the level codes, so the cost is in the number of levels rather than cells.
+
+    Args:
+        index: The multi-index
+        level: The level to find the runs for
+
+    Returns:
+        Positions of the starts of the runs
+    """
+    n = len(index)
+    changes = np.zeros(n, dtype=bool)
+    changes[:1] = True
+    for codes in index.codes[:level + 1]:
+        changes[1:] |= codes[1:] != codes[:-1]
+    return np.flatnonzero(changes)
+
+
+def get_level_strings(
+    index: pd.Index,
+    level: int,
+) -> np.ndarray:
+    """Get the formatted labels of one level of an index for each entry,
+    by formatting the level's unique values and then taking them by the level codes.
+
+    Args:
+        index: The index
+        level: The level to get the labels for
+
+    Returns:
+        Formatted label for each entry of the index
+    """
+    if not isinstance(index, pd.MultiIndex):
+        return get_tex_cell_strings(index)
+    # Missing values are coded -1
+    level_strings = np.append(get_tex_cell_strings(index.levels[level]).astype(object), 'nan')
+    return level_strings[index.codes[level]]
+
+
+def get_column_header_rows(
+    columns: pd.Index,
+    n_index_levels: int,
+) -> List[str]:
+    """Get the header rows for the column labels, 
+    merging repeated labels of the upper levels of multi-level columns into multicolumn cells.
+
+    Args:
+        columns: The column index
+        n_index_levels: Number of levels of the row index, which need header cells to the left of
+            the labels
+
+    Returns:
+        One row for each column level
+    """
+    align = pd.get_option('styler.latex.multicol_align')
+    sparse = pd.get_option('styler.sparse.columns')
+    n_levels = columns.nlevels
+    rows = []
+    for level in range(n_levels):
+        name = columns.names[level]
+        lead = [''] * (n_index_levels - 1) + ['' if name is None else str(name)]
+        labels = get_level_strings(columns, level)
+        if sparse and level < n_levels - 1:
+            starts = get_index_span_starts(columns, level)
+            widths = np.diff(np.append(starts, len(columns)))
+            span_labels = labels[starts].astype(object)
+            multi = widths > 1
+            span_labels[multi] = (
+                '\\multicolumn{'
+                + widths[multi].astype(str).astype(object)
+                + f'}}{{{align}}}{{'
+                + span_labels[multi]
+                + '}'
+            )
+            cells = list(span_labels)
+        else:
+            cells = list(labels)
+        rows.append(' & '.join(lead + cells) + ' \\\\\n')
+    return rows
+
+
+def get_index_cells(
+    index: pd.Index,
+    level_strings: Union[List[np.ndarray], None]=None,
+) -> List[np.ndarray]:
+    """Get the cells for the row labels, one array for each index level, 
+    with repeated labels of the upper levels of a multi-index merged into multirow cells.
+
+    Args:
+        index: The row index
+        level_strings: Formatted labels of each level for each entry, if already available
+
+    Returns:
+        Arrays of the cells for each level
+    """
+    align = pd.get_option('styler.latex.multirow_align')
+    sparse = pd.get_option('styler.sparse.index')
+    n_levels = index.nlevels
+    level_cells = []
+    for level in range(n_levels):
+        labels = level_strings[level] if level_strings else get_level_strings(index, level)
+        if sparse and level < n_levels - 1:
+            starts = get_index_span_starts(index, level)
+            heights = np.diff(np.append(starts, len(index)))
+            span_labels = labels[starts].astype(object)
+            multi = heights > 1
+            span_labels[multi] = (
+                f'\\multirow[{align}]{{'
+                + heights[multi].astype(str).astype(object)
+                + '}{*}{'
+                + span_labels[multi]
+                + '}'
+            )
+            cells = np.full(len(index), '', dtype=object)
+            cells[starts] = span_labels
+            labels = cells
+        level_cells.append(labels)
+    return level_cells
+
+
+def get_tex_tabular_header(
+    table: pd.DataFrame,
+) -> str:
+    """Get the header rows of a TeX tabular for a dataframe.
+
+    Args:
+        table: The pandas table
+
+    Returns:
+        The column label rows (none if there are no columns, as for Styler), 
+        followed by the index name row if the index is named
+    """
+    header_rows = (
+        get_column_header_rows(table.columns, table.index.nlevels) if table.shape[1] else []
+    )
+    if any(n is not None for n in table.index.names):
+        names = ['' if n is None else str(n) for n in table.index.names]
+        header_rows.append(' & '.join(names + [''] * table.shape[1]) + ' \\\\\n')
+    return ''.join(header_rows)
+
+
+def get_tex_tabular_rows(
+    table: Union[pd.DataFrame, ColumnarTable],
+) -> str:
+    """Get the body rows of a TeX tabular for a dataframe,
+    formatting each column as a whole and joining the rows in bulk.
+
+    Args:
+        table: The pandas table, or wrapped table of another type
+
+    Returns:
+        The TeX rows
+    """
+    return join_tex_rows(get_index_cells(table.index) + get_tex_cell_columns(table))
+
+
+def get_tex_cell_columns(
+    table: Union[pd.DataFrame, ColumnarTable],
+) -> List[np.ndarray]:
+    """Get the formatted cells of the body of a table, as one array for each column.
+
+    Args:
+        table: The pandas table, or wrapped table of another type
+
+    Returns:
+        Arrays of the cell strings for each column
+    """
+    if isinstance(table, ColumnarTable):
+        return [get_array_cell_strings(table.get_column(i)) for i in range(table.shape[1])]
+    return [get_tex_cell_strings(table.iloc[:, i]) for i in range(table.shape[1])]
+
+
+def join_tex_rows(
+    cols: List[np.ndarray],
+) -> str:
+    """Join columns of cell strings into TeX rows.
+
+    Args:
+        cols: Arrays of the cell strings for each column (including the index levels)
+
+    Returns:
+        The TeX rows
+    """
+    return ''.join([' & '.join(row) + ' \\\\\n' for row in zip(*cols)])
+
+
+def is_tex_text_dtype(
+    dtype,
+) -> bool:
+    """Whether a column or index type may hold text that needs escaping for TeX
+    (i.e. is not numeric, boolean or a date/time type).
+
+    Args:
+        dtype: The type of the column or index
+
+    Returns:
+        Whether the type may hold text
+    """
+    types = pd.api.types
+    return not any([
+        types.is_numeric_dtype(dtype), 
+        types.is_bool_dtype(dtype), 
+        types.is_datetime64_any_dtype(dtype),
+        types.is_timedelta64_dtype(dtype),
+        isinstance(dtype, pd.PeriodDtype),
+    ])
+
+
+def escape_tex_strings(
+    values: Union[pd.Series, pd.Index],
+) -> Union[pd.Series, pd.Index]:
+    """Escape the characters that TeX treats specially in the strings of a column or index,
+    using pandas string methods over the whole column.
+    Non-string entries of mixed columns are left as they are, 
+    as are columns with no strings at all (e.g. object columns of dates or decimals).
+
+    Args:
+        values: The column or single-level index
+
+    Returns:
+        The escaped column or index
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(object)
+    if pd.api.types.infer_dtype(values, skipna=True) == 'string':
+        return replace_tex_special_chars(values)
+    is_str = np.array([isinstance(v, str) for v in values], dtype=bool)
+    if not is_str.any():
+        return values
+    escaped = values.to_numpy(dtype=object, copy=True)
+    escaped[is_str] = replace_tex_special_chars(pd.Series(escaped[is_str], dtype=object)).to_numpy()
+    if isinstance(values, pd.Index):
+        return pd.Index(escaped, dtype=object, name=values.name)
+    return pd.Series(escaped, index=values.index, name=values.name, dtype=object)
+
+
+def replace_tex_special_chars(
+    strings: Union[pd.Series, pd.Index],
+) -> Union[pd.Series, pd.Index]:
+    """Escape the TeX special characters of a column or index of strings.
+    Backslashes are swapped for a placeholder first so that the braces of their replacement aren't
+    escaped.
+
+    Args:
+        strings: The column or index, with only strings (or missing values) as entries
+
+    Returns:
+        The escaped column or index
+    """
+    escaped = strings.str.replace('\\', '\x00', regex=False)
+    escaped = escaped.str.replace(r'([&%$#_{}])', r'\\\1', regex=True)
+    for char, replacement in TEX_NAMED_CHARS.items():
+        escaped = escaped.str.replace(char, replacement, regex=False)
+    return escaped
+
+
+def escape_tex_name(
+    name,
+):
+    """Escape an index or column name if it is a string.
+
+    Args:
+        name: The name
+
+    Returns:
+        The escaped name
+    """
+    if not isinstance(name, str):
+        return name
+    return escape_tex_strings(pd.Index([name], dtype=object))[0]
+
+
+def escape_tex_index(
+    index: pd.Index,
+) -> pd.Index:
+    """Escape TeX special characters in an index (rows or columns), 
+    working on the unique values of each level of a multi-index.
+
+    Args:
+        index: The index
+
+    Returns:
+        The escaped index
+    """
+    names = [escape_tex_name(n) for n in index.names]
+    if isinstance(index, pd.MultiIndex):
+        levels = [escape_tex_strings(l) if is_tex_text_dtype(l.dtype) else l for l in index.levels]
+        return index.set_levels(levels).set_names(names)
+    if not is_tex_text_dtype(index.dtype):
+        return index.set_names(names)
+    return escape_tex_strings(index).set_names(names)
+
+
+def escape_tex_table(
+    table: pd.DataFrame,
+) -> pd.DataFrame:
+    """Get a version of a table with TeX special characters escaped in its index, column labels
+    and text columns. Numeric, boolean and date columns are passed through untouched.
+
+    Args:
+        table: The table to escape
+
+    Returns:
+        The escaped table
+    """
+    cols = {}
+    for i in range(table.shape[1]):
+        col = table.iloc[:, i]
+        cols[i] = escape_tex_strings(col).array if is_tex_text_dtype(col.dtype) else col.array
+    escaped_table = pd.DataFrame(cols, index=escape_tex_index(table.index))
+    escaped_table.columns = escape_tex_index(table.columns)
+    return escaped_table
+
+
+class TableTexCache:
+    def __init__(
+        self, 
+        maxsize: int=128,
+    ):
+        """Least-recently-used store of rendered table TeX,
+        keyed on the hash of the table's contents, index and columns together with the formatting
+        strings,
+        so that the same table rendered the same way is only rendered once.
+
+        Args:
+            maxsize: Maximum number of rendered tables to keep, with zero turning caching off
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get_tex(
+        self, 
+        render_func: callable, 
+        table: pd.DataFrame, 
+        *format_strs: str,
+    ) -> str:
+        """Get the rendered TeX for a table from the cache, rendering and storing it if not present.
+
+        Args:
+            render_func: The function that renders the table
+            table: The pandas table
+            format_strs: The other (string) arguments to the rendering function
+
+        Returns:
+            The rendered TeX
+        """
+        if not self.maxsize or not isinstance(table, pd.DataFrame):
+            return render_func(table, *format_strs)
+        try:
+            table_hash = get_table_hash(table)
+        except TypeError:
+            return render_func(table, *format_strs)
+        key = (render_func.__name__, table_hash, get_tex_render_options(), format_strs)
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        self.misses += 1
+        text = render_func(table, *format_strs)
+        self._entries[key] = text
+        self._trim()
+        return text
+
+    def set_maxsize(
+        self, 
+        maxsize: int,
+    ):
+        """Change the number of rendered tables kept, dropping the least recently used if needed.
+
+        Args:
+            maxsize: New maximum number of rendered tables to keep
+        """
+        self.maxsize = maxsize
+        self._trim()
+
+    def _trim(self):
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Empty the cache and reset the statistics.
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def cache_info(self) -> dict:
+        """Get the cache statistics.
+
+        Returns:
+            Numbers of hits and misses, maximum size and current size
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'maxsize': self.maxsize,
+            'currsize': len(self._entries),
+        }
+
+
+table_tex_cache = TableTexCache()
+
+
+def cache_table_tex(render_func: callable) -> callable:
+    """Decorator to pass table rendering through the module's table TeX cache.
+
+    Args:
+        render_func: Function taking the table and its formatting strings
+
+    Returns:
+        The cached version of the function
+    """
+    @wraps(render_func)
+    def cached_render(table: pd.DataFrame, *format_strs: str) -> str:
+        return table_tex_cache.get_tex(render_func, table, *format_strs)
+    return cached_render
+
+
+@cache_table_tex
+def get_tex_longtable(
+    table: pd.DataFrame, 
+    col_format_str: str, 
+    caption_str: str, 
+    label_str: str,
+) -> str:
+    """Get TeX longtable code from dataframe.
+
+    Args:
+        table: The pandas table
+        col_format_str: The previously created TeX column format request
+        caption_str: The previously formatted TeX caption request
+        label_str: The previously formatted TeX label request
+
+    Returns:
+        Completed TeX string for table
+    """
+    return wrap_tex_tabular(get_tex_tabular(table, col_format_str), caption_str, label_str, True)
+
+
+def wrap_tex_tabular(
+    table_text: str,
+    caption_str: str, 
+    label_str: str,
+    longtable: bool=False,
+) -> str:
+    """Put the TeX for a tabular environment into a table, or convert it to a longtable.
+
+    Args:
+        table_text: The tabular environment
+        caption_str: The previously formatted TeX caption request
+        label_str: The previously formatted TeX label request
+        longtable: Whether to make a longtable
+
+    Returns:
+        Completed TeX string for table
+    """
+    if longtable:
+        start_str = '\\begin{longtable}\n'
+        table_text = table_text.replace('\\begin{tabular}', '')
+        table_text = table_text.replace('\\end{tabular}', '')
+        end_str = '\\end{longtable}'
+    else:
+        start_str = '\\begin{table}\n'
+        end_str = '\\end{table}'
+    return start_str + table_text + caption_str + label_str + end_str
+
+
+def iter_tex_longtable(
+    chunks: Iterable[pd.DataFrame], 
+    col_format_str: str, 
+    caption_str: str, 
+    label_str: str,
+) -> Iterator[str]:
+    """Get TeX longtable code from a sequence of dataframe chunks with the same columns,
+    such as those from pd.read_csv with chunksize,
+    rendering each chunk's rows as it arrives rather than concatenating the chunks.
+    The output is the same as get_tex_longtable for the concatenated table.
+
+    Args:
+        chunks: The pieces of the table
+        col_format_str: The previously created TeX column format request
+        caption_str: The previously formatted TeX caption request
+        label_str: The previously formatted TeX label request
+
+    Yields:
+        Successive pieces of the TeX for the table
+    """
+    yield f'\\begin{{longtable}}\n{{{col_format_str}}}\n\\toprule\n'
+    header_done = False
+    for chunk in chunks:
+        if chunk.index.nlevels > 1:
+            raise ValueError('Tables supplied in chunks must have a single-level index')
+        if is_native_tex_supported():
+            header_str, rows_str = get_tex_tabular_header(chunk), get_tex_tabular_rows(chunk)
+        else:
+            header_str, rows_str = split_styler_tabular(chunk)
+        if not header_done:
+            yield header_str + '\\midrule\n'
+            header_done = True
+        yield rows_str
+    yield '\\bottomrule\n\n' + caption_str + label_str + '\\end{longtable}'
+
+
+@cache_table_tex
+def get_tex_table(
+    table: pd.DataFrame, 
+    col_format_str: str, 
+    caption_str: str, 
+    label_str: str,
+) -> str:
+    """Get TeX table code from dataframe.
+
+    Args:
+        table: The pandas table
+        col_format_str: The previously created TeX column format request
+        caption_str: The previously formatted TeX caption request
+        label_str: The previously formatted TeX label request
+
+    Returns:
+        Completed TeX string for table
+    """
+    return wrap_tex_tabular(get_tex_tabular(table, col_format_str), caption_str, label_str)
+
+
+@cache_table_tex
+def get_tex_tabular_fragment(
+    table: pd.DataFrame, 
+    col_format_str: str,
+) -> str:
+    """Get TeX tabular code from dataframe as for get_tex_tabular, 
+    but through the table TeX cache, for tables shared as fragments.
+
+    Args:
+        table: The pandas table
+        col_format_str: The previously created TeX column format request
+
+    Returns:
+        TeX string for the tabular environment
+    """
+    return get_tex_tabular(table, col_format_str)
+
+
+def get_table_hash(
+    table: pd.DataFrame,
+) -> str:
+    """Get a hash of a dataframe's contents, index, columns (including their names) and data types.
+
+    Args:
+        table: The dataframe
+
+    Returns:
+        The hex digest summarising the table
+    """
+    table_hash = hashlib.sha256()
+    table_hash.update(pd.util.hash_pandas_object(table, index=True).values.tobytes())
+    table_hash.update(pd.util.hash_pandas_object(table.columns).values.tobytes())
+    table_hash.update(str(table.dtypes.tolist()).encode())
+    table_hash.update(repr((list(table.index.names), list(table.columns.names))).encode())
+    return table_hash.hexdigest()
+
+
+def is_copy_on_write() -> bool:
+    """Whether pandas copy-on-write is in effect (always from pandas 3),
+    so that shallow copies of dataframes are unaffected by later changes to the original.
+
+    Returns:
+        Whether copy-on-write is on
+    """
+    if int(pd.__version__.split('.')[0]) >= 3:
+        return True
+    try:
+        return pd.get_option('mode.copy_on_write') is True
+    except (KeyError, pd.errors.OptionError):
+        return False
+
+
+def get_table_snapshot(table):
+    """Copy a table as it is when added to the document,
+    so that changes made to the caller's table afterwards don't reach the rendered output.
+    Dataframes are copied shallowly under copy-on-write and deeply otherwise,
+    Polars dataframes are cloned (which shares the column buffers until either is modified),
+    and PyArrow tables are left as they are, as they are immutable.
+
+    Args:
+        table: The table
+
+    Returns:
+        The copy of the table
+    """
+    if isinstance(table, pd.DataFrame):
+        return table.copy(deep=not is_copy_on_write())
+    elif isinstance(table, np.ndarray):
+        return table.copy()
+    elif type(table).__module__.startswith('polars') and hasattr(table, 'clone'):
+        return table.clone()
+    return table
+
+
+class TexElement(ABC):
+    """Document entry that keeps its inputs and only produces its TeX when rendered,
+    which happens as the document is emitted.
+    Plain strings are used for raw line entries, 
+    and elements render through str so they can be emitted in the same way.
+    The rendered text is kept along with the key summarising the inputs it was rendered from,
+    and only re-rendered when the key changes.
+    """
+    __slots__ = ('_text', '_key')
+
+    def __init__(self):
+        self._text = None
+        self._key = None
+
+    @property
+    @abstractmethod
+    def label(self) -> str:
+        pass
+
+    @abstractmethod
+    def get_key(self) -> tuple:
+        pass
+
+    @abstractmethod
+    def render(self) -> str:
+        pass
+
+    def adopt_render(self, previous: 'TexElement'):
+        """Take over the rendered text of an element this one is replacing,
+        so that it is reused if the inputs are unchanged.
+
+        Args:
+            previous: The element being replaced
+        """
+        self._text = previous._text
+        self._key = previous._key
+
+    def __str__(self) -> str:
+        key = self.get_key()
+        if self._text is None or key != self._key:
+            self._text = self.render()
+            self._key = key
+        return self._text
+
+    @property
+    def streamed(self) -> bool:
+        return False
+
+    def iter_text(self) -> Iterator[str]:
+        """Yield the element's TeX piece by piece, 
+        which is the whole rendered text unless the element streams its output.
+
+        Yields:
+            Pieces of the TeX
+        """
+        yield str(self)
+
+
+class FigureElement(TexElement):
+    __slots__ = ('title', 'filename', 'filetype', 'fig_path', 'caption', 'fig_width')
+
+    def __init__(
+        self, 
+        title: str, 
+        filename: str, 
+        filetype: str,
+        fig_path: Path,
+        caption: str='',
+        fig_width: float=0.85,
+    ):
+        """Figure with standard formatting.
+
+        Args:
+            title: Figure title
+            filename: Filename for finding the image file
+            filetype: File extension (determines TeX command to use to include the figure)
+            fig_path: Path where the figure file can be found
+            caption: Figure caption
+            fig_width: Figure width relative to document width
+        """
+        if filetype not in FIGURE_COMMANDS:
+            raise ValueError('File type for figure not supported yet')
+        super().__init__()
+        self.title = title
+        self.filename = filename
+        self.filetype = filetype
+        self.fig_path = fig_path
+        self.caption = caption
+        self.fig_width = fig_width
+
+    @property
+    def label(self) -> str:
+        return self.filename
+
+    def get_key(self) -> tuple:
+        return (
+            self.title,
+            self.filename,
+            self.filetype,
+            str(self.fig_path),
+            self.caption,
+            self.fig_width,
+        )
+
+    def render(self) -> str:
+        """Get the TeX for the figure.
+
+        Returns:
+            The figure's TeX lines
+        """
+        command = FIGURE_COMMANDS[self.filetype]
+        width_str = f'width={str(round(self.fig_width, 2))}\\paperwidth'
+        path_str = f'./{self.fig_path}/{self.filename}.{self.filetype}'
+        command_str = f'\\{command}[{width_str}]{{{path_str}}}'
+        lines = [
+            '\\begin{figure}[H]',
+            f'\\caption{{\\textbf{{{self.title}}} {self.caption}}}',
+            '\\begin{adjustbox}{center, max width=\\paperwidth}',
+            command_str,
+            '\\end{adjustbox}',
+            f'\\label{{{self.filename}}}',
+            '\\end{figure}\n',
+        ]
+        return '\n'.join(lines)
+
+
+class ColourRule(ABC):
+    __slots__ = ('columns',)
+
+    def __init__(
+        self, 
+        columns: Union[list, None]=None,
+    ):
+        """Rule for colouring the cells of table columns according to their values,
+        applied to whole columns at once.
+
+        Args:
+            columns: Labels of the columns to colour, or None for all numeric columns
+        """
+        self.columns = columns
+
+    def get_positions(
+        self, 
+        table: pd.DataFrame,
+    ) -> np.ndarray:
+        """Get the positions of the columns the rule applies to.
+
+        Args:
+            table: The table being coloured
+
+        Returns:
+            The column positions
+        """
+        if self.columns is None:
+            is_numeric = [
+                pd.api.types.is_numeric_dtype(t) and not pd.api.types.is_bool_dtype(t)
+                for t in table.dtypes
+            ]
+            return np.flatnonzero(is_numeric)
+        positions = table.columns.get_indexer(self.columns)
+        if (positions == -1).any():
+            raise ValueError('Columns requested for colouring are not in the table')
+        return positions
+
+    @abstractmethod
+    def get_key(self) -> tuple:
+        pass
+
+    @abstractmethod
+    def get_colours(self, values: np.ndarray) -> np.ndarray:
+        pass
+
+
+class ThresholdColourRule(ColourRule):
+    __slots__ = ('thresholds', 'colours')
+
+    def __init__(
+        self, 
+        thresholds: List[float], 
+        colours: List[str],
+        columns: Union[list, None]=None,
+    ):
+        """Colour cells according to the interval between thresholds their values fall into.
+
+        Args:
+            thresholds: Increasing values for the boundaries between intervals
+            colours: xcolor colour for each interval (one more than the thresholds), with empty
+                string for no colour
+            columns: Labels of the columns to colour, or None for all numeric columns
+        """
+        if len(colours) != len(thresholds) + 1:
+            raise ValueError('One more colour than thresholds needed')
+        super().__init__(columns)
+        self.thresholds = list(thresholds)
+        self.colours = list(colours)
+
+    def get_key(self) -> tuple:
+        return ('threshold', tuple(self.thresholds), tuple(self.colours), str(self.columns))
+
+    def get_colours(
+        self, 
+        values: np.ndarray,
+    ) -> np.ndarray:
+        """Get the colours for an array of values.
+
+        Args:
+            values: The cell values
+
+        Returns:
+            Colour for each cell, or empty string for none (including missing values)
+        """
+        colours = np.array(self.colours + [''], dtype=object)
+        bins = np.digitize(values, self.thresholds)
+        bins[np.isnan(values)] = len(self.colours)
+        return colours[bins]
+
+
+class ColourScaleRule(ColourRule):
+    __slots__ = ('low_colour', 'high_colour', 'n_bins', 'vmin', 'vmax')
+
+    def __init__(
+        self, 
+        low_colour: str='white', 
+        high_colour: str='red',
+        n_bins: int=10,
+        vmin: Union[float, None]=None,
+        vmax: Union[float, None]=None,
+        columns: Union[list, None]=None,
+    ):
+        """Colour cells on a scale between two colours, 
+        binning the values into steps of xcolor mixes of the two.
+
+        Args:
+            low_colour: xcolor colour for the lowest values
+            high_colour: xcolor colour for the highest values
+            n_bins: Number of steps in the scale
+            vmin: Value for the low end of the scale, or None for the lowest value in the columns
+            vmax: Value for the high end of the scale, or None for the highest value in the columns
+            columns: Labels of the columns to colour, or None for all numeric columns
+        """
+        super().__init__(columns)
+        self.low_colour = low_colour
+        self.high_colour = high_colour
+        self.n_bins = n_bins
+        self.vmin = vmin
+        self.vmax = vmax
+
+    def get_key(self) -> tuple:
+        return (
+            'scale',
+            self.low_colour,
+            self.high_colour,
+            self.n_bins,
+            self.vmin,
+            self.vmax,
+            str(self.columns),
+        )
+
+    def get_colours(
+        self, 
+        values: np.ndarray,
+    ) -> np.ndarray:
+        """Get the colours for an array of values.
+
+        Args:
+            values: The cell values
+
+        Returns:
+            Colour for each cell, or empty string for none (missing values)
+        """
+        missing = np.isnan(values)
+        if missing.all():
+            return np.full(values.shape, '', dtype=object)
+        vmin = np.nanmin(values) if self.vmin is None else self.vmin
+        vmax = np.nanmax(values) if self.vmax is None else self.vmax
+        scaled = (values - vmin) / (vmax - vmin) if vmax > vmin else np.zeros(values.shape)
+        bins = np.floor(np.nan_to_num(scaled) * self.n_bins)
+        bins = np.clip(bins, 0, self.n_bins - 1).astype(int)
+        shares = (
+            np.linspace(0, 100, self.n_bins).round().astype(int)
+            if self.n_bins > 1
+            else np.array([100])
+        )
+        colours = np.array(
+            [f'{self.high_colour}!{s}!{self.low_colour}' for s in shares] + [''], dtype=object
+        )
+        bins[missing] = self.n_bins
+        return colours[bins]
+
+
+def apply_colour_rules(
+    table: pd.DataFrame,
+    colour_rules: List[ColourRule],
+) -> pd.DataFrame:
+    """Get a version of a table with \\cellcolor commands added to the cells coloured by the rules,
+    with those columns converted to their formatted TeX strings so the rendered layout is unchanged.
+    Where rules overlap, later rules take precedence for the cells they colour.
+
+    Args:
+        table: The table
+        colour_rules: The rules to apply
+
+    Returns:
+        Table with the coloured columns as TeX strings
+    """
+    colours = {}
+    for rule in colour_rules:
+        positions = rule.get_positions(table)
+        if not len(positions):
+            continue
+        values = table.iloc[:, positions].to_numpy(dtype=float, na_value=np.nan)
+        rule_colours = rule.get_colours(values)
+        for i, position in enumerate(positions):
+            previous = colours.get(position)
+            new = rule_colours[:, i]
+            colours[position] = new if previous is None else np.where(new != '', new, previous)
+    if not colours:
+        return table
+    cols = {}
+    for i in range(table.shape[1]):
+        col = table.iloc[:, i]
+        if i in colours:
+            cells = get_tex_cell_strings(col).astype(object)
+            cell_colours = colours[i]
+            coloured = cell_colours != ''
+            cells[coloured] = '\\cellcolor{' + cell_colours[coloured] + '}' + cells[coloured]
+            cols[i] = cells
+        else:
+            cols[i] = col.array
+    coloured_table = pd.DataFrame(cols, index=table.index)
+    coloured_table.columns = table.columns
+    return coloured_table
+
+
+class TableElement(TexElement):
+    __slots__ = (
+        'table',
+        'name',
+        'title',
+        'col_splits',
+        'table_width',
+        'longtable',
+        'caption',
+        'escape',
+        'colour_rules',
+        'row_blocks',
+        'fragment_path',
+        'fragment_folder',
+        'n_chunk_cols',
+        'chunks_reusable',
+        'chunks_read',
+        'chunk_replay',
+    )
+
+    def __init__(
+        self, 
+        table: Union[pd.DataFrame, Iterable[pd.DataFrame], callable, np.ndarray], 
+        name: str,
+        title: str,
+        col_splits: Union[List[float], str, None]=None, 
+        table_width: float=14.0, 
+        longtable: bool=False,
+        caption: str='',
+        escape: bool=False,
+        colour_rules: List[ColourRule]=[],
+        row_blocks: bool=False,
+        fragment_path: Union[Path, None]=None,
+        fragment_folder: str='fragments',
+    ):
+        """Table from a dataframe, 
+        which is copied as it is when the table is added (see get_table_snapshot) and held until
+        rendered.
+        PyArrow tables, Polars dataframes and NumPy structured arrays are rendered from their
+        columns
+        without conversion to pandas (unless escaping or colouring is requested).
+        Longtables can also be supplied as an iterable of dataframe chunks, 
+        or a function with no arguments returning one (e.g. lambda: pd.read_csv(path, chunksize=n)),
+        which are streamed into the output chunk by chunk (without keeping the text) when the
+        document is emitted.
+        Chunks from a function or a re-iterable container are read afresh each time the document is
+        emitted,
+        while the TeX streamed from a one-off iterator (e.g. a generator) is copied to a temporary
+        file 
+        the first time, and replayed from there afterwards.
+
+        Args:
+            table: The table to be written, its chunks or a function returning its chunks
+            name: Short name of table for label
+            title: Title for table
+            col_splits: Optional user request for columns widths if not evenly distributed,
+                or 'auto' to set them from the lengths of the rendered cells
+            table_width: Overall table width if widths not requested
+            longtable: Whether to use the longtable module to span pages
+            caption: Table caption
+            escape: Whether to escape TeX special characters in the index, column labels and text
+                cells
+            colour_rules: Rules for colouring cells according to their values
+            row_blocks: Whether to split the table into blocks of rows sized to stay within TeX's
+                memory,
+                each with the header repeated and a continued caption (longtables only, 
+                as floats cannot break across pages)
+            fragment_path: Path of the document, to write the table to a shared fragment file under
+                it, 
+                or None to render the table in place
+            fragment_folder: Folder under the document path for fragment files
+        """
+        if row_blocks and not longtable:
+            raise ValueError(
+                'Only longtables can be split into row blocks, as floats cannot break across pages'
+            )
+        self.n_chunk_cols = None
+        self.chunks_reusable = False
+        self.chunks_read = False
+        self.chunk_replay = None
+        table = get_table_snapshot(table)
+        columnar = None if isinstance(table, pd.DataFrame) else get_columnar_table(table)
+        if columnar:
+            table = columnar
+        elif not isinstance(table, pd.DataFrame):
+            if not longtable:
+                raise ValueError('Tables supplied in chunks must be written as longtables')
+            if row_blocks:
+                raise ValueError('Tables supplied in chunks cannot be split into row blocks')
+            self.chunks_reusable = callable(table) or not isinstance(table, Iterator)
+            chunks = table() if callable(table) else iter(table)
+            first_chunk = next(chunks, None)
+            if first_chunk is None:
+                raise ValueError('No chunks supplied for table')
+            self.n_chunk_cols = first_chunk.shape[1]
+            if not self.chunks_reusable:
+                table = chain([first_chunk], chunks)
+        if col_splits and col_splits != 'auto' and len(col_splits) != self.get_n_cols(table):
+            raise ValueError('Wrong number of proportion column splits requested')
+        super().__init__()
+        self.table = table
+        self.name = name
+        self.title = title
+        self.col_splits = col_splits
+        self.table_width = table_width
+        self.longtable = longtable
+        self.caption = caption
+        self.escape = escape
+        self.colour_rules = list(colour_rules)
+        self.row_blocks = row_blocks
+        self.fragment_path = fragment_path
+        self.fragment_folder = fragment_folder
+
+    @property
+    def label(self) -> str:
+        return self.name
+
+    def get_n_cols(
+        self, 
+        table: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+    ) -> int:
+        """Get the number of TeX columns, including the index.
+
+        Args:
+            table: The table or its chunks
+
+        Returns:
+            The number of columns
+        """
+        return table.shape[1] + 1 if self.n_chunk_cols is None else self.n_chunk_cols + 1
+
+    def get_key(self) -> tuple:
+        if self.n_chunk_cols is not None:
+            # Chunks can only be read once, so identified by the iterator
+            table_hash = id(self.table)
+        elif isinstance(self.table, ColumnarTable):
+            try:
+                table_hash = self.table.get_hash()
+            except TypeError:
+                # Unhashable cell contents (e.g. lists or structs), so always re-render
+                table_hash = object()
+        else:
+            try:
+                table_hash = get_table_hash(self.table)
+            except TypeError:
+                table_hash = object()  # Unhashable cell contents, so always re-render
+        splits = tuple(self.col_splits) if isinstance(self.col_splits, list) else self.col_splits
+        rule_keys = tuple(r.get_key() for r in self.colour_rules)
+        fragment = (str(self.fragment_path), self.fragment_folder) if self.fragment_path else None
+        return (
+            table_hash,
+            self.name,
+            self.title,
+            splits,
+            self.table_width,
+            self.longtable,
+            self.caption,
+            self.escape,
+            rule_keys,
+            self.row_blocks,
+            fragment,
+            get_tex_render_options(),
+        )
+
+    def prepare_table(
+        self, 
+        table: pd.DataFrame,
+    ) -> pd.DataFrame:
+        """Apply any escaping and then any cell colouring to the table (or a chunk of it).
+
+        Args:
+            table: The table or chunk
+
+        Returns:
+            The table ready for rendering
+        """
+        if isinstance(table, ColumnarTable) and (self.escape or self.colour_rules):
+            table = table.to_pandas()
+        if self.escape:
+            table = escape_tex_table(table)
+        if self.colour_rules:
+            table = apply_colour_rules(table, self.colour_rules)
+        return table
+
+    def render(self) -> str:
+        """Get the TeX for the table, 
+        or the TeX to input it from its fragment file if writing to fragments.
+        For tables that are not longtables or split into blocks, only the tabular goes to the
+        fragment,
+        so the same table with different titles and labels shares one file.
+
+        Returns:
+            The table's TeX
+        """
+        if not self.fragment_path:
+            return self.render_table()
+        fragment_dir = Path(self.fragment_path) / self.fragment_folder
+        if self.n_chunk_cols is not None:
+            fragment_name = write_tex_fragment(self.iter_table_chunks(), fragment_dir)
+            return f'\\input{{{self.fragment_folder}/{fragment_name}}}'
+        if self.longtable or self.row_blocks:
+            fragment_name = write_tex_fragment(self.render_table(), fragment_dir)
+            return f'\\input{{{self.fragment_folder}/{fragment_name}}}'
+        table = self.prepare_table(self.table)
+        tabular = get_tex_tabular_fragment(table, self.get_col_format(table))
+        fragment_name = write_tex_fragment(tabular, fragment_dir)
+        label_str = f'\\label{{{self.name}}}\n'
+        caption_str = f'\\caption{{\\textbf{{{self.title}}} {self.caption}}}\n'
+        return wrap_tex_tabular(
+            f'\\input{{{self.fragment_folder}/{fragment_name}}}\n', caption_str, label_str
+        )
+
+    @property
+    def streamed(self) -> bool:
+        return self.n_chunk_cols is not None and not self.fragment_path and self._text is None
+
+    def iter_text(self) -> Iterator[str]:
+        """Yield the table's TeX piece by piece,
+        streaming tables supplied in chunks one chunk at a time without keeping their text.
+
+        Yields:
+            Pieces of the TeX
+        """
+        if self.streamed:
+            yield from self.iter_table_chunks()
+        else:
+            yield str(self)
+
+    def iter_table_chunks(self) -> Iterator[str]:
+        """Yield the TeX for a table supplied in chunks, reading and rendering one chunk at a time,
+        or replaying it from its temporary file if the chunks came from a one-off iterator that has
+        been read.
+
+        Yields:
+            Pieces of the TeX
+        """
+        if self.chunk_replay is not None:
+            self.chunk_replay.seek(0)
+            yield from iter(lambda: self.chunk_replay.read(1 << 16), '')
+            return
+        if self.chunks_read and not self.chunks_reusable:
+            raise ValueError(
+                f'Chunks of table {self.name} were only partly read, '
+                'so the table cannot be emitted again'
+            )
+        self.chunks_read = True
+        label_str = f'\\label{{{self.name}}}\n'
+        caption_str = f'\\caption{{\\textbf{{{self.title}}} {self.caption}}}\n'
+        chunks = self.table() if callable(self.table) else iter(self.table)
+        chunks = (self.prepare_table(c) for c in chunks)
+        first_chunk = next(chunks, None)
+        if first_chunk is None:
+            raise ValueError(f'No chunks supplied for table {self.name}')
+        col_str = self.get_col_format(first_chunk)
+        replay = None if self.chunks_reusable else tempfile.TemporaryFile('w+', encoding='utf-8')
+        for piece in iter_tex_longtable(
+            chain([first_chunk], chunks), col_str, caption_str, label_str
+        ):
+            if replay is not None:
+                replay.write(piece)
+            yield piece
+        self.chunk_replay = replay
+
+    def get_col_format(
+        self, 
+        table: Union[pd.DataFrame, ColumnarTable, None],
+    ) -> str:
+        """Get the TeX column format request, 
+        measuring the table if the column widths are to be set automatically.
+
+        Args:
+            table: The prepared table (or its first chunk), or None if not available
+
+        Returns:
+            The column format string
+        """
+        splits = self.col_splits
+        if splits == 'auto':
+            splits = get_auto_col_splits(table) if table is not None else None
+        return get_tex_col_format(self.get_n_cols(self.table), splits, self.table_width)
+
+    def render_table(self) -> str:
+        """Get the full TeX for the table.
+
+        Returns:
+            The table's TeX
+        """
+        n_cols = self.get_n_cols(self.table)
+        label_str = f'\\label{{{self.name}}}\n'
+        caption_str = f'\\caption{{\\textbf{{{self.title}}} {self.caption}}}\n'
+        if self.n_chunk_cols is not None:
+            return ''.join(self.iter_table_chunks())
+        table = self.prepare_table(self.table)
+        col_str = self.get_col_format(table)
+        table_func = get_tex_longtable if self.longtable else get_tex_table
+        if not self.row_blocks:
+            return table_func(table, col_str, caption_str, label_str)
+
+        # Later blocks take the number of the first and are left out of the list of tables
+        n_rows = table.shape[0]
+        block_rows = get_table_block_rows(n_rows, n_cols)
+        continued_caption_str = f'\\caption[]{{\\textbf{{{self.title}}} (continued)}}\n'
+        blocks = []
+        for start in range(0, max(n_rows, 1), block_rows):
+            stop = min(start + block_rows, n_rows)
+            block = (
+                table.get_rows(start, stop)
+                if isinstance(table, ColumnarTable)
+                else table.iloc[start:stop]
+            )
+            if start == 0:
+                blocks.append(table_func(block, col_str, caption_str, label_str))
+            else:
+                blocks.append(
+                    '\\addtocounter{table}{-1}\n'
+                    + table_func(block, col_str, continued_caption_str, '')
+                )
+        return '\n'.join(blocks)
+
+
+def get_tex_col_format(
+    n_cols: int,
+    col_splits: Union[List[float], None],
+    table_width: float,
+) -> str:
+    """Get the TeX column format request for a table, 
+    with ragged-right paragraph columns split evenly unless proportions are requested,
+    and widths rounded to four decimal places (so that floating-point residue doesn't reach the
+    TeX).
+
+    Args:
+        n_cols: Number of columns, including the index
+        col_splits: Optional user request for column widths as proportions of the table width
+        table_width: Overall table width (cm)
+
+    Returns:
+        The column format string
+    """
+    splits = col_splits if col_splits else [round(1.0 / n_cols, 4)] * n_cols
+    col_widths = [round(w * table_width, 4) for w in splits]
+    return ' '.join([f'>{{\\raggedright\\arraybackslash}}p{{{width}cm}}' for width in col_widths])
+
+
+def get_text_lengths(
+    strings: np.ndarray,
+) -> np.ndarray:
+    """Get the lengths of rendered cell strings, not counting any cell colouring command.
+
+    Args:
+        strings: The cell strings
+
+    Returns:
+        The lengths
+    """
+    text = pd.Series(strings, dtype=object).str.replace(r'^\\cellcolor\{[^}]*\}', '', regex=True)
+    return text.str.len().to_numpy(dtype=float, na_value=0.0)
+
+
+def get_longest_word_length(
+    label,
+) -> int:
+    """Get the length of the longest word of a header label, 
+    which is the narrowest a ragged-right column can be made without the label overflowing.
+
+    Args:
+        label: The label
+
+    Returns:
+        Number of characters of the longest word
+    """
+    return max([len(w) for w in str(label).split()] + [0])
+
+
+def get_auto_col_splits(
+    table: Union[pd.DataFrame, ColumnarTable],
+    percentile: float=90.0,
+    max_rows: int=AUTO_WIDTH_SAMPLE_ROWS,
+    min_chars: int=3,
+) -> List[float]:
+    """Get column widths as proportions of the table width from the lengths of the rendered cells,
+    taking a high percentile of the lengths in each column (so that a few long entries wrap rather
+    than widening the column),
+    and no less than the longest word of the column's header.
+    The index takes one column, measured on its levels joined by spaces.
+    Tables with more rows than the limit are measured on evenly spaced rows.
+
+    Args:
+        table: The table, prepared for rendering (i.e. after any escaping and colouring)
+        percentile: Percentile of each column's cell lengths to set its width by
+        max_rows: Maximum number of rows to measure
+        min_chars: Narrowest width (in characters) for any column
+
+    Returns:
+        The proportion of the table width for each column, starting with the index
+    """
+    step = max(1, -(-table.shape[0] // max_rows))
+    if isinstance(table, ColumnarTable):
+        cols = [get_array_cell_strings(table.get_column(i)[::step]) for i in range(table.shape[1])]
+        index = table.index[::step]
+    else:
+        sample = table.iloc[::step]
+        cols = get_tex_cell_columns(sample)
+        index = sample.index
+    index_lengths = (
+        sum(get_text_lengths(get_level_strings(index, l)) for l in range(index.nlevels))
+        + index.nlevels
+        - 1
+    )
+    lengths = [index_lengths] + [get_text_lengths(c) for c in cols]
+    header_lengths = [max([get_longest_word_length(n) for n in index.names if n is not None] + [0])]
+    header_lengths += [
+        get_longest_word_length(l[-1] if isinstance(l, tuple) else l) for l in table.columns
+    ]
+    widths = []
+    for col_lengths, header_length in zip(lengths, header_lengths):
+        cell_width = np.percentile(col_lengths, percentile) if len(col_lengths) else 0.0
+        widths.append(max(cell_width, header_length, min_chars))
+    return [round(float(w / sum(widths)), 4) for w in widths]
+
+
+class GroupedTable:
+    __slots__ = (
+        'table',
+        'drop_cols',
+        'escape',
+        'colour_rules',
+        '_prepared',
+        '_header',
+        '_cells',
+        '_level_strings',
+        '_auto_splits',
+        '_table_hash',
+    )
+
+    def __init__(
+        self, 
+        table: pd.DataFrame,
+        drop_cols: list=[],
+        escape: bool=False,
+        colour_rules: List[ColourRule]=[],
+    ):
+        """Table shared by the group tables split from it,
+        which is escaped, coloured and formatted as a whole when the first group is rendered,
+        after which each group's rows are taken from the formatted cells.
+        Colour scales are therefore set from the whole table, so are comparable across groups.
+
+        Args:
+            table: The full table
+            drop_cols: Columns left out of the rendered tables (e.g. those the groups are defined
+                by)
+            escape: Whether to escape TeX special characters in the index, column labels and text
+                cells
+            colour_rules: Rules for colouring cells according to their values
+        """
+        self.table = get_table_snapshot(table)
+        self.drop_cols = list(drop_cols)
+        self.escape = escape
+        self.colour_rules = list(colour_rules)
+        self._prepared = None
+        self._header = None
+        self._cells = None
+        self._level_strings = None
+        self._auto_splits = None
+        self._table_hash = None
+
+    @property
+    def n_cols(self) -> int:
+        return self.table.shape[1] - len(self.drop_cols) + 1
+
+    def get_key(self) -> tuple:
+        return (self.escape, tuple(r.get_key() for r in self.colour_rules), tuple(self.drop_cols))
+
+    def get_hash(self):
+        try:
+            return get_table_hash(self.table)
+        except TypeError:
+            return object()
+
+    def prepare(
+        self, 
+        refresh: bool=False,
+    ):
+        """Format the whole table, if not already done or if its contents have changed.
+
+        Args:
+            refresh: Whether to check the table for changes since it was formatted
+        """
+        if self._prepared is not None and not (
+            refresh and (self.get_hash(), get_tex_render_options()) != self._table_hash
+        ):
+            return
+        table = self.table.drop(columns=self.drop_cols) if self.drop_cols else self.table
+        if self.escape:
+            table = escape_tex_table(table)
+        if self.colour_rules:
+            table = apply_colour_rules(table, self.colour_rules)
+        self._table_hash = (self.get_hash(), get_tex_render_options())
+        self._prepared = table
+        self._auto_splits = None
+        if is_native_tex_supported():
+            self._header = get_tex_tabular_header(table)
+            self._cells = get_tex_cell_columns(table)
+            self._level_strings = [
+                get_level_strings(table.index, l) for l in range(table.index.nlevels)
+            ]
+
+    def get_auto_col_splits(self) -> List[float]:
+        """Get column widths set from the lengths of the rendered cells of the whole table,
+        so that all the groups' tables have the same widths.
+
+        Returns:
+            The proportion of the table width for each column, starting with the index
+        """
+        self.prepare()
+        if self._auto_splits is None:
+            self._auto_splits = get_auto_col_splits(self._prepared)
+        return self._auto_splits
+
+    def get_tabular(
+        self, 
+        positions: np.ndarray,
+        col_format_str: str,
+        refresh: bool=False,
+    ) -> str:
+        """Get the TeX tabular for a group of rows.
+
+        Args:
+            positions: Positions of the group's rows in the table
+            col_format_str: The previously created TeX column format request
+            refresh: Whether to check the table for changes since it was formatted
+
+        Returns:
+            TeX string for the tabular environment
+        """
+        self.prepare(refresh)
+        if self._cells is None or not is_native_tex_supported():
+            return get_tex_tabular(self._prepared.iloc[positions], col_format_str)
+        level_strings = [l[positions] for l in self._level_strings]
+        cols = get_index_cells(self._prepared.index[positions], level_strings) + [
+            c[positions] for c in self._cells
+        ]
+        return join_tex_tabular(col_format_str, self._header, join_tex_rows(cols))
+
+
+class GroupTableElement(TexElement):
+    __slots__ = (
+        'grouped',
+        'positions',
+        'name',
+        'title',
+        'col_splits',
+        'table_width',
+        'longtable',
+        'caption',
+    )
+
+    def __init__(
+        self, 
+        grouped: GroupedTable,
+        positions: np.ndarray,
+        name: str,
+        title: str,
+        col_splits: Union[List[float], str, None]=None, 
+        table_width: float=14.0, 
+        longtable: bool=False,
+        caption: str='',
+    ):
+        """Table for one group of rows of a table shared with the other groups,
+        rendered from the shared formatting of the whole table.
+
+        Args:
+            grouped: The shared table
+            positions: Positions of the group's rows in the table
+            name: Short name of table for label
+            title: Title for table
+            col_splits: Optional user request for columns widths if not evenly distributed,
+                or 'auto' to set them from the lengths of the rendered cells of the whole table
+            table_width: Overall table width if widths not requested
+            longtable: Whether to use the longtable module to span pages
+            caption: Table caption
+        """
+        if col_splits and col_splits != 'auto' and len(col_splits) != grouped.n_cols:
+            raise ValueError('Wrong number of proportion column splits requested')
+        super().__init__()
+        self.grouped = grouped
+        self.positions = positions
+        self.name = name
+        self.title = title
+        self.col_splits = col_splits
+        self.table_width = table_width
+        self.longtable = longtable
+        self.caption = caption
+
+    @property
+    def label(self) -> str:
+        return self.name
+
+    def get_key(self) -> tuple:
+        try:
+            group_hash = get_table_hash(self.grouped.table.iloc[self.positions])
+        except TypeError:
+            group_hash = object()
+        splits = tuple(self.col_splits) if isinstance(self.col_splits, list) else self.col_splits
+        return (
+            group_hash,
+            self.grouped.get_key(),
+            self.name,
+            self.title,
+            splits,
+            self.table_width,
+            self.longtable,
+            self.caption,
+            get_tex_render_options(),
+        )
+
+    def render(self) -> str:
+        """Get the TeX for the group's table.
+
+        Returns:
+            The table's TeX
+        """
+        # Previously rendered, so the shared table may have changed since
+        refresh = self._key is not None
+        self.grouped.prepare(refresh)
+        splits = (
+            self.grouped.get_auto_col_splits() if self.col_splits == 'auto' else self.col_splits
+        )
+        col_str = get_tex_col_format(self.grouped.n_cols, splits, self.table_width)
+        label_str = f'\\label{{{self.name}}}\n'
+        caption_str = f'\\caption{{\\textbf{{{self.title}}} {self.caption}}}\n'
+        table_text = self.grouped.get_tabular(self.positions, col_str, refresh=refresh)
+        return wrap_tex_tabular(table_text, caption_str, label_str, self.longtable)
+
+
+def get_table_block_rows(
+    n_rows: int,
+    n_cols: int,
+    max_cells: int=MAX_TABLE_BLOCK_CELLS,
+) -> int:
+    """Get the number of rows for each block when splitting a table into blocks of bounded size,
+    with the rows spread evenly over the fewest blocks that keep each within the cell limit.
+
+    Args:
+        n_rows: Number of rows of the table
+        n_cols: Number of columns of the table (including the index)
+        max_cells: Maximum number of cells for each block
+
+    Returns:
+        Number of rows per block
+    """
+    max_rows = max(1, max_cells // max(n_cols, 1))
+    n_blocks = max(1, -(-n_rows // max_rows))
+    return max(1, -(-n_rows // n_blocks))
+
+
+def add_colour_packages(
+    preamble: str,
+) -> str:
+    """Add the packages for coloured table cells to a preamble, unless it already passes xcolor its
+    table option.
+    The option is passed straight after the document class, before any other package can load
+    xcolor without it,
+    and xcolor is loaded immediately before the document begins (which has no effect if a package
+    has already loaded it).
+
+    Args:
+        preamble: The rendered preamble
+
+    Returns:
+        The preamble with the colour packages
+    """
+    if '\\PassOptionsToPackage{table}{xcolor}' in preamble or '[table]{xcolor}' in preamble:
+        return preamble
+    class_start = preamble.find('\\documentclass')
+    doc_start = preamble.find('\\begin{document}')
+    if class_start == -1 or doc_start == -1:
+        raise ValueError(
+            'Coloured table cells requested, '
+            'but preamble does not set the document class and begin the document'
+        )
+    class_end = preamble.find('\n', class_start) + 1
+    return ''.join([
+        preamble[:class_end],
+        '\\PassOptionsToPackage{table}{xcolor}\n',
+        preamble[class_end:doc_start],
+        '\\usepackage{xcolor}\n',
+        preamble[doc_start:],
+    ])
+
+
+def get_label_from_heading(
+    heading: str,
+) -> str:
+    """Get the TeX label (and section filename) corresponding to a section/subsection heading.
+
+    Args:
+        heading: The section or subsection heading
+
+    Returns:
+        The label string
+    """
+    return heading.lower().replace(' ', '_')
+
+
+def get_section_filename(
+    heading: str,
+) -> str:
+    """Get the name (without extension) of the file a section is written to when sections are split,
+    from its label with any characters other than letters, digits, underscores and hyphens 
+    (such as path separators) replaced by underscores.
+
+    Args:
+        heading: The section heading
+
+    Returns:
+        The file name
+    """
+    return re.sub(r'[^A-Za-z0-9_\-]', '_', get_label_from_heading(heading))
+
+
+def get_file_hash(
+    filepath: Path,
+    block_size: int=1 << 20,
+) -> str:
+    """Get the hash of a file's contents, reading it in blocks.
+
+    Args:
+        filepath: The file to hash
+        block_size: Number of bytes to read at a time
+
+    Returns:
+        The hex digest of the file contents
+    """
+    file_hash = hashlib.sha256()
+    with open(filepath, 'rb') as hash_file:
+        for block in iter(lambda: hash_file.read(block_size), b''):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+def write_if_changed(
+    filepath: Path,
+    chunks: Union[str, Iterable[str]],
+) -> bool:
+    """Write text to a temporary file alongside the target and move it into place 
+    only if its contents differ from those of the existing file,
+    so that the target is never seen half-written and is left untouched 
+    (including its modification time) if nothing has changed.
+
+    Args:
+        filepath: The file to write to
+        chunks: The full text for the file, or an iterable of pieces of it
+
+    Returns:
+        Whether the file was changed
+    """
+    filepath = Path(filepath)
+    if isinstance(chunks, str):
+        chunks = [chunks]
+    with tempfile.NamedTemporaryFile(
+        'w', dir=filepath.parent, prefix=f'.{filepath.name}.', suffix='.tmp', delete=False
+    ) as temp_file:
+        temp_path = Path(temp_file.name)
+        try:
+            temp_file.writelines(chunks)
+        except BaseException:
+            temp_file.close()
+            temp_path.unlink()
+            raise
+    try:
+        if filepath.exists():
+            same_size = filepath.stat().st_size == temp_path.stat().st_size
+            if same_size and get_file_hash(filepath) == get_file_hash(temp_path):
+                temp_path.unlink()
+                return False
+            shutil.copymode(filepath, temp_path)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(temp_path, 0o666 & ~umask)
+        os.replace(temp_path, filepath)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return True
+
+
+def write_tex_fragment(
+    chunks: Union[str, Iterable[str]],
+    fragment_dir: Path,
+) -> str:
+    """Write TeX to a fragment file named by the hash of its contents, 
+    unless the file is already there (in which case it holds the same text).
+    Text supplied in pieces is hashed as it is written to a temporary file,
+    which is then moved to its name or discarded.
+
+    Args:
+        chunks: The TeX for the fragment, or an iterable of pieces of it
+        fragment_dir: Directory for the fragment files
+
+    Returns:
+        The fragment file name, without the extension (as for \\input)
+    """
+    fragment_dir = Path(fragment_dir)
+    if isinstance(chunks, str):
+        fragment_name = hashlib.sha256(chunks.encode()).hexdigest()[:16]
+        fragment_file = fragment_dir / f'{fragment_name}.tex'
+        if not fragment_file.exists():
+            fragment_dir.mkdir(parents=True, exist_ok=True)
+            write_if_changed(fragment_file, chunks)
+        return fragment_name
+
+    fragment_dir.mkdir(parents=True, exist_ok=True)
+    text_hash = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(
+        'w', dir=fragment_dir, prefix='.fragment.', suffix='.tmp', delete=False
+    ) as temp_file:
+        temp_path = Path(temp_file.name)
+        try:
+            for chunk in chunks:
+                text_hash.update(chunk.encode())
+                temp_file.write(chunk)
+        except BaseException:
+            temp_file.close()
+            temp_path.unlink()
+            raise
+    fragment_name = text_hash.hexdigest()[:16]
+    fragment_file = fragment_dir / f'{fragment_name}.tex'
+    if fragment_file.exists():
+        temp_path.unlink()
+    else:
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temp_path, 0o666 & ~umask)
+        os.replace(temp_path, fragment_file)
+    return fragment_name
+
+
+class SpillStore:
+    def __init__(
+        self, 
+        memory_limit: int, 
+        spill_dir: Union[Path, None]=None,
+    ):
+        """Local on-disk store (an SQLite database in a temporary directory)
+        shared by all the spilling line lists of a document,
+        which keeps track of how much text those lists are holding in memory.
+
+        Args:
+            memory_limit: Number of characters of content to hold in memory before spilling to disc
+            spill_dir: Directory to create the store in, or None for the system temporary directory
+        """
+        self.memory_limit = memory_limit
+        self.in_memory = 0
+        self.lists = []
+        self._temp_dir = tempfile.TemporaryDirectory(dir=spill_dir)
+        self.connection = sqlite3.connect(Path(self._temp_dir.name) / 'content.db')
+        self.connection.execute(
+            'CREATE TABLE lines (list_id INTEGER, position INTEGER, label TEXT, text TEXT, '
+            'PRIMARY KEY (list_id, position))'
+        )
+
+    def register(
+        self, 
+        lines: 'SpillingLines',
+    ) -> int:
+        """Record a new line list using the store.
+
+        Args:
+            lines: The line list
+
+        Returns:
+            The identifier for the list's lines in the store
+        """
+        self.lists.append(lines)
+        return len(self.lists)
+
+    def spill_all(self):
+        """Move the lines held in memory by all the lists to the on-disc store,
+        in a single transaction.
+        """
+        with self.connection:
+            for lines in self.lists:
+                lines.spill_recent()
+
+    def close(self):
+        self.connection.close()
+        self._temp_dir.cleanup()
+
+
+class SpilledElement(TexElement):
+    __slots__ = ('_label',)
+
+    def __init__(
+        self, 
+        label: str, 
+        text: str,
+    ):
+        """Stand-in for an element whose rendered text has been spilled to disc,
+        retaining its label so it can still be replaced in place.
+
+        Args:
+            label: The label of the original element
+            text: The rendered text of the original element
+        """
+        super().__init__()
+        self._label = label
+        self._text = text
+
+    @property
+    def label(self) -> str:
+        return self._label
 
-    Args:
-        df: Dataframe to modify
+    def get_key(self) -> tuple:
+        return self._key
 
-    Returns:
-        Revised dataframe
-    """
-    for l in range(df.columns.nlevels):
-        new_index = df.columns.levels[l].str.replace('_', ' ')
-        df.columns = df.columns.set_levels(new_index, level=l)
-    return df
+    def render(self) -> str:
+        return self._text
 
 
-def get_tex_longtable(
-    table: pd.DataFrame, 
-    col_format_str: str, 
-    caption_str: str, 
-    label_str: str,
-) -> str:
-    """Get TeX longtable code from dataframe.
+def get_line_size(
+    value,
+    render: bool=False,
+) -> int:
+    """Get the number of characters a document entry holds in memory.
+
+    Streamed elements (tables supplied in chunks) are never rendered for this, 
+    as they don't hold their text, so only their label is counted.
 
     Args:
-        table: The pandas table
-        col_format_str: The previously created TeX column format request
-        caption_str: The previously formatted TeX caption request
-        label_str: The previously formatted TeX label request
+        value: The entry (a string, an element or None for a blanked entry)
+        render: Whether to render an element to find its size, rather than using any text already
+            rendered
 
     Returns:
-        Completed TeX string for table
+        The number of characters
     """
-    start_str = '\\begin{longtable}\n'
-    table_text = table.style.to_latex(column_format=col_format_str, hrules=True)
-    table_text = table_text.replace('\\begin{tabular}', '')
-    table_text = table_text.replace('\\end{tabular}', '')
-    end_str = '\\end{longtable}'
-    return start_str + table_text + caption_str + label_str + end_str
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, TexElement):
+        if value.streamed:
+            return len(value.label)
+        return len(str(value)) if render else len(value._text or '')
+    return 0
 
 
-def get_tex_table(
-    table: pd.DataFrame, 
-    col_format_str: str, 
-    caption_str: str, 
-    label_str: str,
-) -> str:
-    """Get TeX table code from dataframe.
+class SpillingLines(MutableSequence):
+    def __init__(
+        self, 
+        store: SpillStore,
+    ):
+        """List-like container for the lines of a section/subsection that moves its contents 
+        to the on-disc store once the store's memory limit is exceeded.
+        Elements are rendered as they are added, so their text counts towards the limit,
+        and once the limit is exceeded all the document's lists are spilled together.
+        Streamed elements (tables supplied in chunks) are not rendered, 
+        but kept as they are when their list is spilled, so that they stream their text when the
+        document is emitted.
+        Entries that have been spilled can be read and replaced, but not deleted or inserted before.
 
-    Args:
-        table: The pandas table
-        col_format_str: The previously created TeX column format request
-        caption_str: The previously formatted TeX caption request
-        label_str: The previously formatted TeX label request
+        Args:
+            store: The store shared across the document
+        """
+        self.store = store
+        self.list_id = store.register(self)
+        self.streamed_elements = {}
+        self.n_spilled = 0
+        self.recent = []
+        self.recent_size = 0
 
-    Returns:
-        Completed TeX string for table
-    """
-    start_str = '\\begin{table}\n'
-    table_text = table.style.to_latex(column_format=col_format_str, hrules=True)
-    end_str = '\\end{table}'
-    return start_str + table_text + caption_str + label_str + end_str
+    def __len__(self) -> int:
+        return self.n_spilled + len(self.recent)
+
+    def _get_position(self, index: int) -> int:
+        if not isinstance(index, int):
+            raise TypeError('Spilling line lists only support integer indices')
+        position = index + len(self) if index < 0 else index
+        if not 0 <= position < len(self):
+            raise IndexError('Line index out of range')
+        return position
+
+    def __getitem__(self, index: int):
+        position = self._get_position(index)
+        if position >= self.n_spilled:
+            return self.recent[position - self.n_spilled]
+        if position in self.streamed_elements:
+            return self.streamed_elements[position]
+        label, text = self.store.connection.execute(
+            'SELECT label, text FROM lines WHERE list_id = ? AND position = ?',
+            (self.list_id, position),
+        ).fetchone()
+        return SpilledElement(label, text) if label is not None else text
+
+    def __setitem__(self, index: int, value):
+        position = self._get_position(index)
+        if position >= self.n_spilled:
+            old_size = get_line_size(self.recent[position - self.n_spilled])
+            self.recent[position - self.n_spilled] = value
+            self._track(value, old_size)
+            return
+        self.streamed_elements.pop(position, None)
+        label = value.label if isinstance(value, TexElement) else None
+        if isinstance(value, TexElement) and value.streamed:
+            self.streamed_elements[position] = value
+            text = None
+        else:
+            text = None if value is None else str(value)
+        self.store.connection.execute(
+            'UPDATE lines SET label = ?, text = ? WHERE list_id = ? AND position = ?', 
+            (label, text, self.list_id, position),
+        )
+
+    def __delitem__(self, index: int):
+        position = self._get_position(index)
+        if position < self.n_spilled:
+            raise NotImplementedError('Lines already spilled to disc cannot be deleted')
+        old_size = get_line_size(self.recent[position - self.n_spilled])
+        del self.recent[position - self.n_spilled]
+        self._track(None, old_size)
+
+    def insert(self, index: int, value):
+        if index < 0:
+            index = max(index + len(self), 0)
+        if index < self.n_spilled:
+            raise NotImplementedError(
+                'Lines cannot be inserted before those already spilled to disc'
+            )
+        self.recent.insert(index - self.n_spilled, value)
+        self._track(value)
+
+    def append(self, value):
+        self.recent.append(value)
+        self._track(value)
+
+    def extend(self, values: Iterable):
+        for value in values:
+            self.append(value)
+
+    def _track(
+        self, 
+        value, 
+        old_size: int=0,
+    ):
+        size = get_line_size(value, render=True) - old_size
+        self.recent_size += size
+        self.store.in_memory += size
+        if self.store.in_memory > self.store.memory_limit:
+            self.store.spill_all()
+
+    def spill(self):
+        """Move the lines held in memory to the on-disc store.
+        """
+        with self.store.connection:
+            self.spill_recent()
+
+    def spill_recent(self):
+        """Write the lines held in memory to the on-disc store, 
+        within a transaction managed by the caller.
+        """
+        if not self.recent:
+            return
+        rows = []
+        for i, line in enumerate(self.recent):
+            if isinstance(line, TexElement) and line.streamed:
+                self.streamed_elements[self.n_spilled + i] = line
+                rows.append((self.list_id, self.n_spilled + i, line.label, None))
+            else:
+                label = line.label if isinstance(line, TexElement) else None
+                rows.append(
+                    (self.list_id, self.n_spilled + i, label, None if line is None else str(line))
+                )
+        self.store.connection.executemany('INSERT INTO lines VALUES (?, ?, ?, ?)', rows)
+        self.n_spilled += len(self.recent)
+        self.store.in_memory -= self.recent_size
+        self.recent = []
+        self.recent_size = 0
+
+    def __iter__(self):
+        cursor = self.store.connection.execute(
+            'SELECT position, text FROM lines WHERE list_id = ? ORDER BY position', (self.list_id,)
+        )
+        for position, text in cursor:
+            yield self.streamed_elements.get(position, text)
+        yield from list(self.recent)
 
 
 class TexDoc(ABC):
@@ -109,12 +2750,40 @@ class TexDoc(ABC):
     def add_line(self, line: str, section: str, subsection: str=''):
         pass
 
+    @abstractmethod
+    def add_lines(self, lines: Iterable[str], section: str, subsection: str=''):
+        pass
+
+    @abstractmethod
+    def section_writer(self, section: str, subsection: str=''):
+        pass
+
+    @abstractmethod
+    def add_element(self, element: TexElement, section: str, subsection: str=''):
+        pass
+
     @abstractmethod
     def prepare_doc(self):
         pass
 
     @abstractmethod
-    def write_doc(self, order: list=[]):
+    def write_doc(
+        self, 
+        order: list=[],
+        split_sections: bool=False,
+        include_sections: bool=False,
+        include_only: list=[],
+    ) -> bool:
+        pass
+
+    @abstractmethod
+    def iter_doc(
+        self, 
+        section_order: list=[],
+        split_sections: bool=False,
+        include_sections: bool=False,
+        include_only: list=[],
+    ):
         pass
 
     @abstractmethod
@@ -129,6 +2798,31 @@ class TexDoc(ABC):
     def include_table(self, table: pd.DataFrame, section: str, subsection: str='', col_splits=None, table_width=14.0, longtable=False):
         pass
 
+    @abstractmethod
+    def include_grouped_tables(
+        self, 
+        table: pd.DataFrame,
+        by,
+        name: str,
+        title: str,
+        section: str,
+        subsection: str='',
+        **kwargs,
+    ) -> List[str]:
+        pass
+
+    @abstractmethod
+    def include_posterior_table(
+        self, 
+        draws, 
+        name: str, 
+        title: str, 
+        section: str, 
+        subsection: str='', 
+        **kwargs,
+    ) -> pd.DataFrame:
+        pass
+
     @abstractmethod
     def save_content(self):
         pass
@@ -149,10 +2843,35 @@ class DummyTexDoc(TexDoc):
     def add_line(self, line: str, section: str, subsection: str=''):
         pass
 
+    def add_lines(self, lines: Iterable[str], section: str, subsection: str=''):
+        pass
+
+    @contextmanager
+    def section_writer(self, section: str, subsection: str=''):
+        yield lambda line: None
+
+    def add_element(self, element: TexElement, section: str, subsection: str=''):
+        pass
+
     def prepare_doc(self):
         pass
 
-    def write_doc(self, order: list=[]):
+    def write_doc(
+        self, 
+        order: list=[],
+        split_sections: bool=False,
+        include_sections: bool=False,
+        include_only: list=[],
+    ) -> bool:
+        pass
+
+    def iter_doc(
+        self, 
+        section_order: list=[],
+        split_sections: bool=False,
+        include_sections: bool=False,
+        include_only: list=[],
+    ):
         pass
 
     def emit_doc(self, section_order: list=[]) -> str:
@@ -164,6 +2883,29 @@ class DummyTexDoc(TexDoc):
     def include_table(self, table: pd.DataFrame, section: str, subsection: str='', col_splits=None, table_width=14.0, longtable=False):
         pass
 
+    def include_grouped_tables(
+        self, 
+        table: pd.DataFrame,
+        by,
+        name: str,
+        title: str,
+        section: str,
+        subsection: str='',
+        **kwargs,
+    ) -> List[str]:
+        pass
+
+    def include_posterior_table(
+        self, 
+        draws, 
+        name: str, 
+        title: str, 
+        section: str, 
+        subsection: str='', 
+        **kwargs,
+    ) -> pd.DataFrame:
+        pass
+
     def save_content(self):
         pass
 
@@ -179,6 +2921,8 @@ class ConcreteTexDoc:
         title: str, 
         bib_filename: str,
         table_of_contents: bool=False,
+        spill_limit: Union[int, None]=None,
+        spill_dir: Union[Path, None]=None,
     ):
         """Object for collating document elements and emitting of a TeX-formatted string.
 
@@ -188,7 +2932,11 @@ class ConcreteTexDoc:
             title: Title to go in the document
             bib_filename: Name of the bibliography file
             table_of_contents: Whether to include a table of contents
+            spill_limit: Characters of section content to hold in memory before spilling to disc,
+                or None to keep all in memory
+            spill_dir: Directory for the on-disc content store if spilling
         """
+        self.spill_store = SpillStore(spill_limit, spill_dir) if spill_limit is not None else None
         self.content = {}
         self.path = path
         self.doc_name = doc_name
@@ -197,6 +2945,12 @@ class ConcreteTexDoc:
         self.prepared = False
         self.standard_sections = ['preamble', 'endings']
         self.table_of_contents = table_of_contents
+        self.section_folder = 'sections'
+        self.fragment_folder = 'fragments'
+        self._rendered = {}
+        self._dirty = set()
+        self._element_locations = {}
+        self.colour_cells = False
 
     def add_line(
         self, 
@@ -213,63 +2967,392 @@ class ConcreteTexDoc:
             section: The heading of the section for the line to go into
             subsection: The heading of the subsection for the line to go into
         """
+        subsection = subsection or ''
+        self._get_lines(section, subsection).append(line)
+        self._dirty.add((section, subsection))
+
+    def add_lines(
+        self, 
+        lines: Iterable[str], 
+        section: str, 
+        subsection: str='',
+    ):
+        """Add several line strings to the appropriate section/subsection of the document,
+        looking up the target only once.
+
+        Args:
+            lines: The TeX lines to write, which may be any iterable including a generator
+            section: The heading of the section for the lines to go into
+            subsection: The heading of the subsection for the lines to go into
+        """
+        subsection = subsection or ''
+        self._get_lines(section, subsection).extend(lines)
+        self._dirty.add((section, subsection))
+
+    @contextmanager
+    def section_writer(
+        self, 
+        section: str, 
+        subsection: str='',
+    ):
+        """Context manager providing a function to add single lines to a section/subsection,
+        with the target resolved once on entry.
+
+        Args:
+            section: The heading of the section for the lines to go into
+            subsection: The heading of the subsection for the lines to go into
+
+        Yields:
+            Function taking a TeX line to add
+        """
+        subsection = subsection or ''
+        lines = self._get_lines(section, subsection)
+        try:
+            yield lines.append
+        finally:
+            self._dirty.add((section, subsection))
+
+    def _get_lines(
+        self, 
+        section: str, 
+        subsection: str,
+    ) -> List[str]:
+        """Get the list of lines for a section/subsection, creating it if not yet present.
+
+        Args:
+            section: The heading of the section
+            subsection: The heading of the subsection, or empty string for the section intro
+
+        Returns:
+            The list of lines that the section/subsection content is stored in
+        """
         if section not in self.content:
             self.content[section] = {}
-        if not subsection:
-            if '' not in self.content[section]:
-                self.content[section][''] = []
-            self.content[section][''].append(line)
-        else:
-            if subsection not in self.content[section]:
-                self.content[section][subsection] = []
-            self.content[section][subsection].append(line)
-        
+        section_content = self.content[section]
+        if subsection not in section_content:
+            section_content[subsection] = (
+                SpillingLines(self.spill_store) if self.spill_store else []
+            )
+        return section_content[subsection]
+
+    def add_element(
+        self, 
+        element: TexElement, 
+        section: str, 
+        subsection: str='',
+    ):
+        """Add a labelled element to the document, replacing any element of the same type already
+        added with the same label.
+        Replacement is done in place by looking up where the label was stored, 
+        and the previous rendering is kept for reuse if the element's inputs are unchanged.
+        If the element is requested for a different section/subsection, 
+        the previous entry is blanked and the new one added at the requested location.
+
+        Args:
+            element: The document element
+            section: The heading of the section for the element to go into
+            subsection: The heading of the subsection for the element to go into
+
+        Raises:
+            ValueError: If the label is already used by an element of another type (e.g. a table
+                and a figure)
+        """
+        subsection = subsection or ''
+        location = self._element_locations.get(element.label)
+        if location:
+            prev_section, prev_subsection, position, prev_type = location
+            if prev_type is not type(element):
+                raise ValueError(
+                    f'Label {element.label} is already used by a {prev_type.__name__} '
+                    'in the document'
+                )
+            prev_lines = self.content.get(prev_section, {}).get(prev_subsection, [])
+            if (
+                position < len(prev_lines)
+                and isinstance(prev_lines[position], TexElement)
+                and prev_lines[position].label == element.label
+            ):
+                element.adopt_render(prev_lines[position])
+                self._dirty.add((prev_section, prev_subsection))
+                if (prev_section, prev_subsection) == (section, subsection):
+                    prev_lines[position] = element
+                    return
+                prev_lines[position] = None
+        lines = self._get_lines(section, subsection)
+        lines.append(element)
+        self._dirty.add((section, subsection))
+        self._element_locations[element.label] = (
+            section,
+            subsection,
+            len(lines) - 1,
+            type(element),
+        )
+
     def prepare_doc(self):
         """Placeholder method for overwriting in parent class.
         """
         self.prepared = True
 
-    def write_doc(self, order: list=[]):
-        """Write the compiled document string to disc.
+    def write_doc(
+        self, 
+        order: list=[],
+        split_sections: bool=False,
+        include_sections: bool=False,
+        include_only: list=[],
+    ) -> bool:
+        """Write the compiled document to disc,
+        streaming the chunks rather than building the whole string first.
+        The file is replaced atomically and only if its content has changed.
+        If splitting sections, each section goes to its own file in the section folder,
+        handled in the same way.
 
         Args:
-            order: Section order to pass through to emit_doc method
+            order: Section order to pass through to iter_doc method
+            split_sections: Whether to write each section to a separate file for input to the main
+                document
+            include_sections: Whether to write each section to a separate file as an \\include unit
+            include_only: Sections to compile (through \\includeonly) if including sections, or
+                empty for all
+
+        Returns:
+            Whether any file was changed (so whether the document needs recompiling)
         """
-        with open(self.path / f'{self.doc_name}.tex', 'w') as doc_file:
-            doc_file.write(self.emit_doc(section_order=order))
-    
-    def emit_doc(self, section_order: list=[]) -> str:
-        """Collate all the sections together into the big string to be outputted.
+        sections = self._get_section_order(order)
+        self._check_include_only(sections, include_sections, include_only)
+        if split_sections or include_sections:
+            self._check_section_files(sections)
+        if not self.prepared:
+            self.prepare_doc()
+        changed = False
+        if split_sections or include_sections:
+            section_path = self.path / self.section_folder
+            section_path.mkdir(exist_ok=True)
+            for section in sections:
+                section_file = section_path / f'{get_section_filename(section)}.tex'
+                changed |= write_if_changed(section_file, self._generate_section_chunks(section))
+        doc_file = self.path / f'{self.doc_name}.tex'
+        doc_chunks = self._generate_chunks(sections, split_sections, include_sections, include_only)
+        changed |= write_if_changed(doc_file, doc_chunks)
+        return changed
+
+    def iter_doc(
+        self, 
+        section_order: list=[],
+        split_sections: bool=False,
+        include_sections: bool=False,
+        include_only: list=[],
+    ):
+        """Get the document text as a lazy sequence of chunks
+        (preamble lines, section headers, section lines and endings),
+        checking the requested order up front so errors are raised before anything is written.
 
         Arguments:
             section_order: The order to write the document sections in
+            split_sections: Whether to input the sections from their separate files rather than
+                include their text
+            include_sections: Whether to \\include the sections from their separate files
+            include_only: Sections to compile if including sections, or empty for all
 
         Returns:
-            The final text to write into the document
+            Generator of successive pieces of the final text
+        """
+        sections = self._get_section_order(section_order)
+        self._check_include_only(sections, include_sections, include_only)
+        if split_sections or include_sections:
+            self._check_section_files(sections)
+        if not self.prepared:
+            self.prepare_doc()
+        return self._generate_chunks(sections, split_sections, include_sections, include_only)
+
+    def _get_section_order(
+        self, 
+        section_order: list,
+    ) -> List[str]:
+        """Check the requested section order against the contents.
+
+        Args:
+            section_order: The requested order, or empty list to use the order of the contents
+
+        Returns:
+            The non-standard sections in the order to be written
         """
         content_sections = sorted([s for s in self.content if s not in self.standard_sections])
         if section_order and sorted(section_order) != content_sections:
             msg = 'Sections requested are not those in the current contents'
             raise ValueError(msg)
         order = section_order if section_order else self.content.keys()
+        return [k for k in order if k not in self.standard_sections]
 
-        if not self.prepared:
-            self.prepare_doc()
-        final_text = ''
-        for line in self.content['preamble']['']:
-            final_text += f'{line}\n'
-        for section in [k for k in order if k not in self.standard_sections]:
-            final_text += f'\n\\section{{{section}}} \\label{{{section.lower().replace(" ", "_")}}}\n'
-            if '' in self.content[section]:
-                for line in self.content[section]['']:
-                    final_text += f'{line}\n'
-            for subsection in [k for k in self.content[section].keys() if k != '']:
-                final_text += f'\n\\subsection{{{subsection}}} \\label{{{subsection.lower().replace(" ", "_")}}}\n'
-                for line in self.content[section][subsection]:
-                    final_text += f'{line}\n'
-        for line in self.content['endings']['']:
-            final_text += f'{line}\n'
-        return final_text
+    @staticmethod
+    def _check_section_files(
+        sections: List[str],
+    ):
+        """Check that no two sections would be written to the same file when sections are split
+        (e.g. headings differing only in case or punctuation).
+
+        Args:
+            sections: The non-standard sections to be written
+        """
+        filenames = {}
+        for section in sections:
+            filename = get_section_filename(section)
+            if filename in filenames:
+                raise ValueError(
+                    f'Sections "{filenames[filename]}" and "{section}" '
+                    f'would both be written to {filename}.tex'
+                )
+            filenames[filename] = section
+
+    @staticmethod
+    def _check_include_only(
+        sections: List[str],
+        include_sections: bool,
+        include_only: list,
+    ):
+        """Check a request for partial compilation is consistent with the sections to be written.
+
+        Args:
+            sections: The non-standard sections to be written
+            include_sections: Whether sections are to be written as \\include units
+            include_only: The sections requested for compilation
+        """
+        if include_only and not include_sections:
+            raise ValueError('Partial compilation requested without including sections')
+        if any(s not in sections for s in include_only):
+            raise ValueError('Sections requested for compilation are not in the current contents')
+
+    def _get_rendered(
+        self, 
+        section: str, 
+        subsection: str='',
+    ) -> str:
+        """Get the text for the lines of one section/subsection,
+        re-rendering only if lines have been added since it was last rendered.
+        Note that edits made directly to self.content bypass this tracking.
+
+        Args:
+            section: The heading of the section
+            subsection: The heading of the subsection, or empty string for the section intro
+
+        Returns:
+            The rendered lines of the section/subsection
+        """
+        key = (section, subsection)
+        if key in self._dirty or key not in self._rendered:
+            self._rendered[key] = ''.join(
+                f'{line}\n' for line in self.content[section][subsection] if line is not None
+            )
+            self._dirty.discard(key)
+        return self._rendered[key]
+
+    def _generate_section_chunks(
+        self, 
+        section: str,
+    ):
+        """Yield the text of one section piece by piece.
+
+        Args:
+            section: The heading of the section
+        """
+        yield f'\n\\section{{{section}}} \\label{{{get_label_from_heading(section)}}}\n'
+        if '' in self.content[section]:
+            yield from self._generate_block_chunks(section)
+        for subsection in [k for k in self.content[section].keys() if k != '']:
+            label_str = get_label_from_heading(subsection)
+            yield f'\n\\subsection{{{subsection}}} \\label{{{label_str}}}\n'
+            yield from self._generate_block_chunks(section, subsection)
+
+    def _generate_block_chunks(
+        self, 
+        section: str, 
+        subsection: str='',
+    ):
+        """Yield the text for the lines of one section/subsection,
+        streaming line by line (without caching) if it has been spilled to disc
+        or if it holds any elements, which keep their own rendered text 
+        (or stream it, for tables supplied in chunks), so that it is not held twice.
+        Blocks of plain lines are joined and cached.
+
+        Args:
+            section: The heading of the section
+            subsection: The heading of the subsection, or empty string for the section intro
+        """
+        lines = self.content[section][subsection]
+        key = (section, subsection)
+        if isinstance(lines, SpillingLines) and lines.n_spilled:
+            self._rendered.pop(key, None)
+            for line in lines:
+                if isinstance(line, TexElement):
+                    yield from line.iter_text()
+                    yield '\n'
+                elif line is not None:
+                    yield f'{line}\n'
+        elif key in self._rendered and key not in self._dirty:
+            yield self._rendered[key]
+        elif any(isinstance(line, TexElement) for line in lines):
+            self._rendered.pop(key, None)
+            for line in lines:
+                if isinstance(line, TexElement):
+                    yield from line.iter_text()
+                    yield '\n'
+                elif line is not None:
+                    yield f'{line}\n'
+        else:
+            yield self._get_rendered(section, subsection)
+
+    def _generate_chunks(
+        self, 
+        sections: List[str],
+        split_sections: bool=False,
+        include_sections: bool=False,
+        include_only: list=[],
+    ):
+        """Yield the document text piece by piece.
+        Because \\includeonly must come before the document begins,
+        it is inserted into the preamble immediately before \\begin{document}.
+
+        Args:
+            sections: The validated order of the non-standard document sections
+            split_sections: Whether to input the sections from their separate files
+            include_sections: Whether to include the sections from their separate files
+            include_only: The sections to compile if including sections
+        """
+        preamble = self._get_rendered('preamble')
+        if self.colour_cells:
+            preamble = add_colour_packages(preamble)
+        if include_only:
+            files = ','.join(
+                [f'{self.section_folder}/{get_section_filename(s)}' for s in include_only]
+            )
+            doc_start = preamble.find('\\begin{document}')
+            if doc_start == -1:
+                raise ValueError(
+                    'Partial compilation requested, but preamble does not begin the document'
+                )
+            yield preamble[:doc_start]
+            yield f'\\includeonly{{{files}}}\n'
+            yield preamble[doc_start:]
+        else:
+            yield preamble
+        for section in sections:
+            if include_sections:
+                yield f'\\include{{{self.section_folder}/{get_section_filename(section)}}}\n'
+            elif split_sections:
+                yield f'\\input{{{self.section_folder}/{get_section_filename(section)}}}\n'
+            else:
+                yield from self._generate_section_chunks(section)
+        yield self._get_rendered('endings')
+
+    def emit_doc(self, section_order: list=[]) -> str:
+        """Collate all the sections together into the big string to be outputted.
+
+        Arguments:
+            section_order: The order to write the document sections in
+
+        Returns:
+            The final text to write into the document
+        """
+        return ''.join(self.iter_doc(section_order=section_order))
 
     def include_figure(
         self, 
@@ -294,70 +3377,241 @@ class ConcreteTexDoc:
             caption: Figure caption
             fig_width: Figure width relative to document width
         """
-        if filetype == 'jpg':
-            command = 'includegraphics'
-        elif filetype == 'svg':
-            command = 'includesvg'
-        else:
-            raise ValueError('File type for figure not supported yet')
-        self.add_line('\\begin{figure}[H]', section, subsection)
-        self.add_line(f'\\caption{{\\textbf{{{title}}} {caption}}}', section, subsection)
-        self.add_line('\\begin{adjustbox}{center, max width=\paperwidth}', section, subsection)
-        command_str = f'\\{command}[width={str(round(fig_width, 2))}\\paperwidth]{{./{fig_path}/{filename}.{filetype}}}'
-        self.add_line(command_str, section, subsection)
-        self.add_line('\\end{adjustbox}', section, subsection)
-        self.add_line(f'\\label{{{filename}}}', section, subsection)
-        self.add_line('\\end{figure}\n', section, subsection)
+        figure = FigureElement(
+            title, filename, filetype, fig_path, caption=caption, fig_width=fig_width
+        )
+        self.add_element(figure, section, subsection)
 
     def include_table(
         self, 
-        table: pd.DataFrame, 
+        table: Union[pd.DataFrame, Iterable[pd.DataFrame], callable, np.ndarray], 
         name: str,
         title: str,
         section: str, 
         subsection: str='', 
-        col_splits: Union[List[float], None]=None, 
+        col_splits: Union[List[float], str, None]=None, 
         table_width: float=14.0, 
         longtable: bool=False,
         caption: str='',
+        escape: bool=False,
+        colour_rules: List[ColourRule]=[],
+        row_blocks: bool=False,
+        fragment: bool=False,
     ):
         """Use a dataframe to add a table to the working document.
+        PyArrow tables, Polars dataframes and NumPy structured arrays can also be supplied,
+        and are rendered directly from their columns.
+        Longtables can also be supplied as an iterable of dataframe chunks (e.g. from pd.read_csv
+        with chunksize),
+        or a function with no arguments returning one (e.g. lambda: pd.read_csv(path, chunksize=n)) 
+        so that the chunks are read afresh each time the document is emitted,
+        and are rendered chunk by chunk without being concatenated.
 
         Args:
-            table: The table to be written
+            table: The table to be written, its chunks or a function returning its chunks
             name: Short name of table for label
             title: Title for table
             section: The heading of the section for the figure to go into
             subsection: The heading of the subsection for the figure to go into
-            col_splits: Optional user request for columns widths if not evenly distributed
+            col_splits: Optional user request for columns widths if not evenly distributed,
+                or 'auto' to set them in proportion to the lengths of the rendered cells (see
+                get_auto_col_splits)
             table_width: Overall table width if widths not requested
             longtable: Whether to use the longtable module to span pages
+            caption: Table caption
+            escape: Whether to escape TeX special characters in the index, column labels and text
+                cells
+            colour_rules: Rules for colouring cells according to their values (e.g.
+                ThresholdColourRule, ColourScaleRule),
+                which also adds xcolor with its table option to the preamble (see
+                add_colour_packages)
+            row_blocks: Whether to split the table into blocks of rows (sized automatically from
+                the numbers of rows and columns) 
+                to stay within TeX's memory limits, repeating the header and continuing the caption
+                (longtables only)
+            fragment: Whether to write the table to a fragment file in the fragment folder, named
+                by its content,
+                and input it from there, so that tables repeated across sections and documents are
+                written once
         """
-        n_cols = table.shape[1] + 1
-        if not col_splits:
-            splits = [round(1.0 / n_cols, 4)] * n_cols
-        elif len(col_splits) != n_cols:
-            raise ValueError('Wrong number of proportion column splits requested')
-        else:
-            splits = col_splits
-        col_widths = [w * table_width for w in splits]
-        col_str = ' '.join([f'>{{\\raggedright\\arraybackslash}}p{{{width}cm}}' for width in col_widths])
-        label_str = f'\label{{{name}}}\n'
-        caption_str = f'\caption{{\\textbf{{{title}}} {caption}}}\n'
-        table_str = get_tex_longtable(table, col_str, caption_str, label_str) if longtable else get_tex_table(table, col_str, caption_str, label_str)
-        self.add_line(table_str, section, subsection=subsection)
+        table_element = TableElement(
+            table, name, title, col_splits, table_width, longtable, caption, 
+            escape=escape, colour_rules=colour_rules, row_blocks=row_blocks,
+            fragment_path=self.path if fragment else None, fragment_folder=self.fragment_folder,
+        )
+        self.add_element(table_element, section, subsection)
+        self.colour_cells = self.colour_cells or bool(colour_rules)
+
+    def include_grouped_tables(
+        self, 
+        table: pd.DataFrame,
+        by: Union[str, List[str]],
+        name: str,
+        title: str,
+        section: str, 
+        subsection: str='', 
+        col_splits: Union[List[float], str, None]=None, 
+        table_width: float=14.0, 
+        longtable: bool=False,
+        caption: str='',
+        escape: bool=False,
+        colour_rules: List[ColourRule]=[],
+        sort: bool=True,
+    ) -> List[str]:
+        """Add a separate table for each group of rows of a dataframe (e.g. by region or scenario),
+        formatting the whole dataframe once and taking each group's rows from the formatted cells.
+        Each table is labelled with the name and the group values, and titled with the title and
+        the group values,
+        with a numbered suffix added to the label of any group whose label would otherwise repeat
+        an earlier group's 
+        (e.g. groups differing only in case).
+        Columns the groups are defined by are left out of the tables, 
+        and the groups are taken from the dataframe when it is included.
+
+        Args:
+            table: The table to be split into groups
+            by: Column or index level name(s) to group the rows by
+            name: Short name for the labels, which are followed by the group values
+            title: Title for the tables, which is followed by the group values
+            section: The heading of the section for the tables to go into
+            subsection: The heading of the subsection for the tables to go into
+            col_splits: Optional user request for columns widths if not evenly distributed,
+                or 'auto' to set them from the lengths of the rendered cells of the whole table
+            table_width: Overall table width if widths not requested
+            longtable: Whether to use the longtable module to span pages
+            caption: Caption for each table
+            escape: Whether to escape TeX special characters in the index, column labels, text
+                cells and group values
+            colour_rules: Rules for colouring cells according to their values, applied across the
+                whole table
+            sort: Whether to order the tables by the group values rather than as they first appear
+
+        Returns:
+            The labels of the tables added
+        """
+        by_list = by if isinstance(by, list) else [by]
+        drop_cols = [b for b in by_list if b in table.columns]
+        grouped = GroupedTable(table, drop_cols, escape=escape, colour_rules=colour_rules)
+        self.colour_cells = self.colour_cells or bool(colour_rules)
+        group_positions = table.groupby(by, sort=sort, observed=True, dropna=False).indices
+        labels = []
+        for group, positions in group_positions.items():
+            group_values = group if isinstance(group, tuple) else (group,)
+            group_str = ', '.join(str(v) for v in group_values)
+            base_label = f'{name}_{get_label_from_heading(group_str).replace(",", "")}'
+            group_label = base_label
+            n_repeat = 1
+            while group_label in labels:
+                n_repeat += 1
+                group_label = f'{base_label}_{n_repeat}'
+            group_title = f'{title}: {escape_tex_name(group_str) if escape else group_str}'
+            group_element = GroupTableElement(
+                grouped,
+                positions,
+                group_label,
+                group_title,
+                col_splits,
+                table_width,
+                longtable,
+                caption,
+            )
+            self.add_element(group_element, section, subsection)
+            labels.append(group_label)
+        return labels
+
+    def include_posterior_table(
+        self, 
+        draws: Union[
+            np.ndarray, pd.DataFrame, Iterable[np.ndarray], Iterable[pd.DataFrame], str, Path
+        ],
+        name: str,
+        title: str,
+        section: str,
+        subsection: str='',
+        param_names: Union[List[str], None]=None,
+        central: float=0.5,
+        lower: float=0.025,
+        upper: float=0.975,
+        decimal_places: int=2,
+        sig_figs: Union[int, None]=None,
+        chunk_size: int=100000,
+        **table_kwargs,
+    ) -> pd.DataFrame:
+        """Summarise posterior draws with streaming algorithms and add the summary as a table,
+        with columns for the mean, standard deviation, 'central (lower--upper)' interval 
+        and effective sample size of each parameter.
+
+        Args:
+            draws: The draws as accepted by get_posterior_summary (including .npy and .parquet file
+                paths)
+            name: Short name of table for label
+            title: Title for table
+            section: The heading of the section for the table to go into
+            subsection: The heading of the subsection for the table to go into
+            param_names: Names for the parameters, if not taken from the draws' columns
+            central: The quantile for the central estimate
+            lower: The quantile for the lower bound
+            upper: The quantile for the upper bound
+            decimal_places: Decimal places for the mean, standard deviation and interval
+            sig_figs: Significant figures for these, which take precedence over decimal places if
+                given
+            chunk_size: Number of draws per chunk for arrays, dataframes and files
+            table_kwargs: Further arguments to include_table
+
+        Returns:
+            The unformatted summary table
+        """
+        summary = get_posterior_summary(draws, [central, lower, upper], param_names, chunk_size)
+        interval_col = f'{central:.1%} ({lower:.1%}--{upper:.1%})'.replace('.0%', '%').replace(
+            '%', '\\%'
+        )
+        table = pd.DataFrame(index=summary.index)
+        table['Mean'] = get_rounded_strings(summary['mean'].to_numpy(), decimal_places, sig_figs)
+        table['SD'] = get_rounded_strings(summary['sd'].to_numpy(), decimal_places, sig_figs)
+        table[interval_col] = get_interval_table(
+            summary[[central, lower, upper]], central, lower, upper, decimal_places, sig_figs
+        ).iloc[:, 0]
+        ess = summary['ess'].to_numpy()
+        table['ESS'] = np.where(np.isnan(ess), '', np.char.mod('%.0f', np.nan_to_num(ess)))
+        self.include_table(table, name, title, section, subsection, **table_kwargs)
+        return summary
 
     def save_content(self):
-        """Save the current document information as a simple string.
+        """Save the current document information as a simple string,
+        with any elements rendered to their TeX strings (without keeping the text of streamed
+        elements).
         """
+        content = {}
+        for sec, sec_content in self.content.items():
+            content[sec] = {}
+            for sub, lines in sec_content.items():
+                content[sec][sub] = [
+                    ''.join(l.iter_text()) if isinstance(l, TexElement) else str(l)
+                    for l in lines
+                    if l is not None
+                ]
         with open(self.path / f'{self.doc_name}.yml', 'w') as file:
-            yml.dump(self.content, file)
+            yml.dump(content, file)
 
     def load_content(self):
         """Read saved document information. 
         """
         with open(self.path / f'{self.doc_name}.yml', 'r') as file:
             self.content = yml.load(file, Loader=yml.FullLoader)
+        self.colour_cells = any(
+            '\\cellcolor' in line
+            for sec_content in self.content.values()
+            for lines in sec_content.values()
+            for line in lines
+        )
+        if self.spill_store:
+            for sec_content in self.content.values():
+                for sub, lines in sec_content.items():
+                    sec_content[sub] = SpillingLines(self.spill_store)
+                    sec_content[sub].extend(lines)
+        self._rendered = {}
+        self._dirty = set()
+        self._element_locations = {}
 
 
 class StandardTexDoc(ConcreteTexDoc):
@@ -0,0 +1,77 @@
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from emutools.tex import StandardTexDoc, get_tex_tabular
+
+
+def get_best_time(func, repeats=3):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def test_native_tabular_benchmark():
+    table = pd.DataFrame(
+        np.random.default_rng(0).normal(size=(10000, 20)), columns=[f'c{i}' for i in range(20)]
+    )
+    assert get_tex_tabular(table, 'l') == table.style.to_latex(column_format='l', hrules=True)
+    styler_time = get_best_time(
+        lambda: table.style.to_latex(column_format='l', hrules=True), repeats=1
+    )
+    native_time = get_best_time(lambda: get_tex_tabular(table, 'l'))
+    print(f'10k x 20 tabular: Styler {styler_time:.2f} s, native {native_time:.2f} s')
+    assert native_time * 3 < styler_time
+
+
+def get_cold_emit_time(n_lines, repeats=3):
+    times = []
+    for _ in range(repeats):
+        doc = StandardTexDoc(Path('.'), 'doc', 'Title', 'refs')
+        for i in range(n_lines):
+            doc.add_line(
+                f'Line {i} of the document, long enough to be a typical sentence of text.',
+                f'Section {i % 100}',
+            )
+        doc.add_line('x' * n_lines * 10, 'Section 0')  # A long table embedded as a single string
+        times.append(get_best_time(doc.emit_doc, repeats=1))
+    return min(times)
+
+
+def test_emit_scales_linearly():
+    small_time = get_cold_emit_time(20000)
+    large_time = get_cold_emit_time(200000)
+    print(f'Emit: 20k lines {small_time:.3f} s, 200k lines {large_time:.3f} s')
+    assert large_time < 20 * small_time
+
+
+def get_sectioned_doc(n_sections=200, n_lines=200):
+    doc = StandardTexDoc(Path('.'), 'doc', 'Title', 'refs')
+    for section in range(n_sections):
+        doc.add_lines(
+            [f'Line {i} of section {section}.' for i in range(n_lines)], f'Section {section}'
+        )
+    return doc
+
+
+def test_reemit_after_one_line_change_benchmark():
+    cold_doc = get_sectioned_doc()
+    cold_doc.add_line('A new line.', 'Section 100')
+    cold_time = get_best_time(cold_doc.emit_doc, repeats=1)
+    doc = get_sectioned_doc()
+    doc.emit_doc()
+    doc.add_line('A new line.', 'Section 100')
+    reemit_time = get_best_time(doc.emit_doc, repeats=1)
+    print(
+        f'200 sections: cold emit {cold_time * 1000:.1f} ms, '
+        f're-emit after one line {reemit_time * 1000:.1f} ms'
+    )
+    assert doc.emit_doc() == get_sectioned_doc().emit_doc().replace(
+        'Line 199 of section 100.\n', 'Line 199 of section 100.\nA new line.\n'
+    )
+    assert reemit_time * 3 < cold_time
@@ -0,0 +1,86 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from emutools.tex import StandardTexDoc, ThresholdColourRule
+
+
+def get_doc(path, **kwargs):
+    return StandardTexDoc(Path(path), 'doc', 'Title', 'refs', **kwargs)
+
+
+def test_label_used_by_another_element_type(tmp_path):
+    doc = get_doc(tmp_path)
+    doc.include_table(pd.DataFrame({'a': [1.0]}), 'x', 'Table', 'Results')
+    with pytest.raises(ValueError, match='already used by a TableElement'):
+        doc.include_figure('Figure', 'x', 'jpg', Path(tmp_path), 'Results')
+    doc.include_table(pd.DataFrame({'a': [2.0]}), 'x', 'Table', 'Results')
+    out = doc.emit_doc()
+    assert out.count('\\label{x}') == 1
+    assert '2.000000' in out
+
+
+def get_chunks(table, chunk_size=50):
+    return (table.iloc[i:i + chunk_size] for i in range(0, len(table), chunk_size))
+
+
+@pytest.mark.parametrize('source', ['generator', 'list', 'callable'])
+def test_chunked_table_emitted_repeatedly(tmp_path, source):
+    table = pd.DataFrame(np.random.default_rng(0).random((400, 3)))
+    expected_doc = get_doc(tmp_path / 'expected')
+    expected_doc.include_table(table, 'big', 'Big', 'Results', longtable=True)
+    expected = expected_doc.emit_doc()
+    chunks = {
+        'generator': get_chunks(table), 
+        'list': list(get_chunks(table)), 
+        'callable': lambda: get_chunks(table),
+    }[source]
+    doc = get_doc(tmp_path)
+    doc.include_table(chunks, 'big', 'Big', 'Results', longtable=True)
+    assert doc.emit_doc() == expected
+    doc.write_doc()
+    assert (tmp_path / 'doc.tex').read_text() == expected
+    assert doc.emit_doc() == expected
+
+
+def test_spilling_keeps_chunked_tables_streamed(tmp_path):
+    table = pd.DataFrame(np.random.default_rng(0).random((400, 3)))
+
+    def build(**kwargs):
+        doc = get_doc(tmp_path, **kwargs)
+        doc.add_line('intro ' * 50, 'Results')
+        doc.include_table(get_chunks(table), 'big', 'Big', 'Results', longtable=True)
+        for i in range(20):
+            doc.add_line(f'line {i} ' * 20, 'Results')
+        return doc
+
+    expected = build().emit_doc()
+    doc = build(spill_limit=100)
+    lines = doc.content['Results']['']
+    assert lines.n_spilled == len(lines)
+    element = lines.streamed_elements[1]
+    assert element._text is None
+    assert doc.emit_doc() == expected
+    assert doc.emit_doc() == expected
+    assert element._text is None
+
+
+def test_colour_packages_only_with_colour_rules(tmp_path):
+    doc = get_doc(tmp_path)
+    doc.include_table(pd.DataFrame({'a': [1.0, 2.0]}), 'plain', 'Plain', 'Results')
+    assert 'xcolor' not in doc.emit_doc()
+    rule = ThresholdColourRule([1.5], ['', 'red!20'])
+    doc.include_table(
+        pd.DataFrame({'a': [1.0, 2.0]}), 'coloured', 'Coloured', 'Results', colour_rules=[rule]
+    )
+    out = doc.emit_doc()
+    lines = out.splitlines()
+    assert lines[1] == '\\PassOptionsToPackage{table}{xcolor}'
+    assert lines.index('\\usepackage{xcolor}') == lines.index('\\begin{document}') - 1
+    assert '\\cellcolor{red!20}' in out
+    doc.save_content()
+    loaded = get_doc(tmp_path)
+    loaded.load_content()
+    assert loaded.emit_doc().count('\\PassOptionsToPackage{table}{xcolor}') == 1
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from emutools.posterior import get_posterior_summary
+
+
+@pytest.mark.parametrize('n_draws, chunk_size', [(2000, 7), (200000, 1000)])
+def test_posterior_summary_many_small_chunks(n_draws, chunk_size):
+    draws = np.random.default_rng(0).normal(size=(n_draws, 2))
+    summary = get_posterior_summary(draws, chunk_size=chunk_size)
+    assert np.allclose(summary['mean'], draws.mean(axis=0))
+    assert np.allclose(summary['sd'], draws.std(axis=0, ddof=1))
+    assert np.allclose(summary[0.5], np.median(draws, axis=0), atol=0.05)
+    assert (summary['ess'] > 0).all() and (summary['ess'] <= n_draws).all()
+
+
+def get_ar1_trace(n_draws, coefficient, seed=0):
+    shocks = np.random.default_rng(seed).normal(size=n_draws)
+    trace = np.empty(n_draws)
+    value = 0.0
+    for i, shock in enumerate(shocks.tolist()):
+        value = coefficient * value + shock
+        trace[i] = value
+    return trace
+
+
+@pytest.mark.parametrize('chunk_size', [100, 1000, 100000])
+def test_posterior_quantiles_autocorrelated_chunks(chunk_size):
+    trace = get_ar1_trace(1000000, 0.99)
+    quantiles = [0.025, 0.5, 0.975]
+    summary = get_posterior_summary(
+        trace[:, np.newaxis], quantiles, chunk_size=chunk_size, resolution=1000
+    )
+    for quantile in quantiles:
+        assert abs((trace <= summary[quantile].iloc[0]).mean() - quantile) < 1.0 / 1000
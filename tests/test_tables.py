@@ -0,0 +1,194 @@
+import datetime
+import decimal
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import emutools.tex as tex
+from emutools.tex import (
+    StandardTexDoc,
+    escape_tex_table,
+    get_columnar_table,
+    get_tex_col_format,
+    get_tex_tabular,
+    get_auto_col_splits,
+)
+
+
+@pytest.mark.parametrize('copy_on_write', [True, False])
+def test_table_snapshot_on_include(tmp_path, monkeypatch, copy_on_write):
+    monkeypatch.setattr(tex, 'is_copy_on_write', lambda: copy_on_write, raising=False)
+    doc = StandardTexDoc(Path(tmp_path), 'doc', 'Title', 'refs')
+    summary = pd.DataFrame({'value': [0.0]}, index=['total'])
+    for region, value in [('north', 1.25), ('south', 7.5)]:
+        summary['value'] = value
+        doc.include_table(summary, f'tab_{region}', region, 'Results')
+    out = doc.emit_doc()
+    north, south = out.split('\\label{tab_north}')[0], out.split('\\label{tab_north}')[1]
+    assert '1.25' in north and '7.50' not in north
+    assert '7.50' in south
+
+
+def test_escape_object_columns_without_strings():
+    dates = [datetime.date(2020, 1, 1), datetime.date(2020, 2, 1)]
+    table = pd.DataFrame(
+        {
+            'date': dates,
+            'decimal': [decimal.Decimal('1.5'), decimal.Decimal('2')],
+            'int': np.array([1, 2], dtype=object),
+            'mixed': ['a_b', 3],
+        },
+        index=pd.MultiIndex.from_arrays([dates, ['r_1', 'r%2']]),
+    )
+    escaped = escape_tex_table(table)
+    assert escaped['date'].tolist() == dates
+    assert escaped['decimal'].tolist() == table['decimal'].tolist()
+    assert escaped['int'].tolist() == [1, 2]
+    assert escaped['mixed'].tolist() == ['a\\_b', 3]
+    assert escaped.index.get_level_values(0).tolist() == dates
+    assert escaped.index.get_level_values(1).tolist() == ['r\\_1', 'r\\%2']
+    assert escape_tex_table(table.set_index('date')).index.tolist() == dates
+
+
+def get_arrow_columns():
+    pa = pytest.importorskip('pyarrow')
+    dates = [datetime.date(2020, 1, 1), None, datetime.date(2021, 3, 4)]
+    times = [datetime.datetime(2020, 1, 1, 5), None, datetime.datetime(2021, 3, 4)]
+    return {
+        'string': pa.array(['a', None, 'c']),
+        'large_string': pa.array(['a', None, 'c'], type=pa.large_string()),
+        'dictionary': pa.array(['a', None, 'a']).dictionary_encode(),
+        'bool': pa.array([True, None, False]),
+        'int': pa.array([1, None, 3]),
+        'float': pa.array([1.5, None, 3.0]),
+        'decimal': pa.array([decimal.Decimal('1.5'), None, decimal.Decimal('2.25')]),
+        'date32': pa.array(dates),
+        'date64': pa.array(dates, type=pa.date64()),
+        'timestamp': pa.array(times),
+        'timestamp_tz': pa.array(times, type=pa.timestamp('us', tz='UTC')),
+        'duration': pa.array([datetime.timedelta(1), None, datetime.timedelta(2)]),
+        'list': pa.array([[1, 2], None, [3]]),
+        'struct': pa.array([{'x': 1}, None, {'x': 2}]),
+        'binary': pa.array([b'a', None, b'c']),
+    }
+
+
+@pytest.mark.parametrize('library', ['pyarrow', 'polars'])
+def test_columnar_tables_render_as_pandas(library):
+    pa = pytest.importorskip('pyarrow')
+    table = pa.table(get_arrow_columns())
+    if library == 'polars':
+        table = pytest.importorskip('polars').from_arrow(table)
+    columnar = get_columnar_table(table)
+    for i in range(columnar.shape[1]):
+        expected = get_tex_tabular(table.to_pandas().iloc[:, [i]], 'll')
+        block = get_tex_tabular(get_columnar_table(table.select([columnar.columns[i]])), 'll')
+        assert block == expected, columnar.columns[i]
+
+
+def test_structured_array_with_object_fields():
+    records = np.array(
+        [(1, 'a', decimal.Decimal('1')), (2, 'b', None)], 
+        dtype=[('i', int), ('s', object), ('d', object)],
+    )
+    changed = records.copy()
+    changed['s'][0] = 'z'
+    table_hash = get_columnar_table(records).get_hash()
+    assert table_hash == get_columnar_table(records.copy()).get_hash()
+    assert table_hash != get_columnar_table(changed).get_hash()
+
+
+def test_col_format_widths_rounded():
+    assert get_tex_col_format(2, [0.4, 0.6], 14.0) == ' '.join(
+        [f'>{{\\raggedright\\arraybackslash}}p{{{w}cm}}' for w in ['5.6', '8.4']]
+    )
+    table = pd.DataFrame({'short': ['a'] * 20, 'long': ['a much longer piece of text'] * 20})
+    col_format = get_tex_col_format(3, get_auto_col_splits(table), 14.0)
+    widths = [w.split('cm')[0] for w in col_format.split('p{')[1:]]
+    assert all(len(w.split('.')[-1]) <= 4 for w in widths)
+
+
+def get_parity_tables():
+    rng = np.random.default_rng(0)
+    col_levels = pd.MultiIndex.from_product([['s1', 's2'], ['inc', 'deaths'], ['q5', 'q50']])
+    row_levels = pd.MultiIndex.from_tuples([('a', 1), ('a', 2), ('b', 1), ('a', 3)])
+    multi = pd.DataFrame(np.arange(32).reshape(4, 8), index=row_levels, columns=col_levels)
+    named_multi = multi.rename_axis(
+        index=['region', 'n'], columns=['scenario', 'output', 'quantile']
+    )
+    return {
+        'mixed_dtypes': pd.DataFrame(
+            {
+                'float': [1.5, np.nan, -0.0, np.inf, 1e20],
+                'int': [1, 2000, -3, 0, 5],
+                'bool': [True, False, True, True, False],
+                'str': ['x', None, 'a_b', '%', ''],
+                'datetime': pd.to_datetime(
+                    ['2020-01-01', None, '2021-03-04', '2020-01-01', '2020-01-01']
+                ),
+            },
+            index=[0.5, 1.25, 3, 4, 5],
+        ),
+        'extension_dtypes': pd.DataFrame(
+            {
+                'Int64': pd.array([1, None], dtype='Int64'),
+                'category': pd.Categorical(['a', 'b']),
+                'object': pd.Series([1.5, 'x'], dtype=object),
+                'float32': np.array([0.1, 0.2], dtype='float32'),
+                'complex': [1 + 2j, 3j],
+            }
+        ),
+        'no_rows': pd.DataFrame(columns=['a', 'b']),
+        'no_columns': pd.DataFrame(index=[1, 2]),
+        'no_columns_named_index': pd.DataFrame(index=pd.Index([1, 2], name='idx')),
+        'no_columns_multiindex': pd.DataFrame(
+            index=pd.MultiIndex.from_tuples([(1, 'a'), (1, 'b')], names=['x', 'y'])
+        ),
+        'numeric_labels': pd.DataFrame({0: [1.0], 1.5: [2]}, index=pd.Index(['r'], name='idx')),
+        'named_columns': pd.DataFrame({'a': [1]}).rename_axis(columns='cols'),
+        'datetime_index': pd.DataFrame({'a': [1]}, index=pd.to_datetime(['2020-01-01'])),
+        'random': pd.DataFrame(rng.normal(size=(50, 5))),
+        'multiindex': multi,
+        'multiindex_named': named_multi,
+        'multiindex_partly_named': multi.rename_axis(index=[None, 'n']),
+        'multicolumn_no_spans': pd.DataFrame(
+            np.arange(4).reshape(2, 2),
+            columns=pd.MultiIndex.from_tuples([('x', 'a'), ('y', 'a')]),
+        ),
+        'multiindex_repeated_rows': pd.DataFrame(
+            np.arange(6).reshape(3, 2),
+            index=pd.MultiIndex.from_tuples([('a', 'x'), ('a', 'x'), ('b', 'y')]),
+        ),
+        'multiindex_missing_labels': pd.DataFrame(
+            np.arange(9.0).reshape(3, 3), 
+            index=pd.MultiIndex.from_tuples([('a', 1.5, 'u'), ('a', 1.5, 'v'), (np.nan, 2.0, 'v')]),
+        ),
+        'multicolumn_missing_labels': pd.DataFrame(
+            np.arange(4).reshape(2, 2),
+            columns=pd.MultiIndex.from_tuples([('x', 1), (np.nan, 2)]),
+        ),
+        'multiindex_three_levels': pd.DataFrame(
+            np.arange(16).reshape(8, 2),
+            index=pd.MultiIndex.from_product([['a', 'b'], ['c', 'd'], ['e', 'f']]),
+        ),
+    }
+
+
+PARITY_OPTIONS = {
+    'default': {'styler.format.precision': 6},
+    'precision': {'styler.format.precision': 2},
+    'not_sparse': {'styler.sparse.index': False, 'styler.sparse.columns': False},
+    'alignment': {'styler.latex.multirow_align': 't', 'styler.latex.multicol_align': 'l'},
+    'styler_fallback': {'styler.format.na_rep': '--', 'styler.format.thousands': ','},
+}
+
+
+@pytest.mark.parametrize('options', PARITY_OPTIONS.keys())
+@pytest.mark.parametrize('name', get_parity_tables().keys())
+def test_native_tabular_matches_styler(name, options):
+    table = get_parity_tables()[name]
+    with pd.option_context(*[v for item in PARITY_OPTIONS[options].items() for v in item]):
+        expected = table.style.to_latex(column_format='ll', hrules=True)
+        assert get_tex_tabular(table, 'll') == expected